@@ -0,0 +1,401 @@
+"""
+Milo Bitcoin - 训练公共模块
+simple_trainer.py 和 unsloth_trainer.py 共用的数据、模型和训练器构建逻辑
+
+两个入口共享同一份默认配置和同一组分词缓存 (final_data/tok_{split}_{key})，
+任一脚本跑过预分词后，另一个脚本直接复用。
+"""
+
+import hashlib
+import json
+import os
+
+# 必须在导入torch之前设置: 可扩展段减少变长序列造成的显存碎片
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True,max_split_size_mb:512")
+# Trainer的wandb回调负责init，只需指定项目名
+os.environ.setdefault("WANDB_PROJECT", "milo-bitcoin-finetuning")
+# 默认离线记录，避免训练循环中的网络上传；训练结束后用 `wandb sync` 同步
+os.environ.setdefault("WANDB_MODE", "offline")
+
+import sys
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import torch
+from datasets import Dataset, load_dataset, load_from_disk
+from transformers import TrainerCallback
+from trl import SFTConfig, SFTTrainer
+from rich.console import Console
+
+console = Console()
+
+try:
+    from unsloth import FastLanguageModel
+    from unsloth import is_bfloat16_supported
+    console.print("✅ Unsloth导入成功")
+except ImportError as e:
+    console.print(f"❌ Unsloth导入失败: {e}")
+    sys.exit(1)
+
+
+def default_config() -> Dict:
+    """默认训练配置 - RTX 5090优化"""
+    return {
+        # 模型配置
+        "model_name": "openai/gpt-oss-20b",  # 真正的GPT-OSS-20B (21B参数)
+        "max_seq_length": 2048,  # 上限，预分词后按p99收紧
+        "dtype": None,  # 自动选择最佳类型
+        "load_in_4bit": True,  # 4-bit量化节省内存
+
+        # LoRA配置
+        "lora_r": 32,  # rank (减半以降低每步LoRA FLOPs)
+        "lora_alpha": 64,  # 2*r配比
+        "lora_dropout": 0.1,
+        "target_modules": ["q_proj", "k_proj", "v_proj", "o_proj"],  # GPT-OSS-20B attention模块
+        "lora_bias": "none",
+        "task_type": "CAUSAL_LM",
+
+        # 训练参数
+        "per_device_train_batch_size": 8,
+        "per_device_eval_batch_size": 8,
+        "gradient_accumulation_steps": 4,  # 有效批次大小: 8*4=32
+        "learning_rate": 2e-4,  # Unsloth支持更高学习率
+        "num_train_epochs": 2,  # 只训练回复部分后收敛更快
+        "max_steps": -1,  # 使用epochs而非steps
+        "warmup_steps": 100,
+        "weight_decay": 0.01,
+        "lr_scheduler_type": "linear",
+        "seed": 42,
+
+        # 内存优化
+        "gradient_checkpointing": True,  # LoRA侧使用Unsloth的checkpoint实现
+        "optim": "paged_adamw_8bit",  # 分页优化器状态，按需换出到主机内存
+        "fp16": not is_bfloat16_supported(),
+        "bf16": is_bfloat16_supported(),
+        "dataloader_pin_memory": True,  # 锁页内存，H2D拷贝与计算重叠
+        "dataloader_num_workers": 8,
+        "dataloader_persistent_workers": True,  # 跨epoch复用worker
+        "torch_compile": True,  # wrapped packing下批次形状固定，可融合LoRA小算子并捕获CUDA graph
+        "torch_compile_mode": "reduce-overhead",
+        "dataset_num_proc": min(8, os.cpu_count()),
+        "packing": True,  # 与group_by_length二选一
+        # TRL默认的bfd是无padding拼接，每步批次长度不同，会让reduce-overhead反复重编译；
+        # wrapped把样本切成固定的[batch, max_seq_length]块
+        "packing_strategy": "wrapped",
+        "group_by_length": False,  # 关闭packing时开启，按长度分桶减少批内padding
+
+        # 监控和保存
+        "eval_steps": 100,
+        "save_steps": 1000,  # 最佳adapter由回调单独保存
+        "logging_steps": 10,
+        "evaluation_strategy": "steps",
+        "save_strategy": "steps",
+        "load_best_model_at_end": False,  # 避免训练结束时从磁盘回读最佳检查点
+        "metric_for_best_model": "eval_loss",
+        "greater_is_better": False,
+        "save_total_limit": 1,
+
+        # wandb配置
+        "report_to": "wandb",
+        "run_name": f"milo-bitcoin-{pd.Timestamp.now().strftime('%Y%m%d-%H%M')}",
+    }
+
+
+def enable_tf32():
+    """LoRA的FP32主权重和LayerNorm等残余FP32 matmul走TF32 tensor core"""
+    torch.set_float32_matmul_precision("high")
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+
+
+class SaveBestAdapterCallback(TrainerCallback):
+    """评估指标改善时只保存LoRA adapter，替代load_best_model_at_end的整体回读"""
+
+    def __init__(self, output_dir, metric_name="eval_loss", greater_is_better=False):
+        self.best_dir = Path(output_dir) / "best"
+        self.metric_name = metric_name
+        self.greater_is_better = greater_is_better
+        self.best_metric = None
+
+    def on_evaluate(self, args, state, control, metrics=None, model=None, **kwargs):
+        value = (metrics or {}).get(self.metric_name)
+        if value is None:
+            return
+        improved = self.best_metric is None or (
+            value > self.best_metric if self.greater_is_better else value < self.best_metric
+        )
+        if improved:
+            self.best_metric = value
+            model.save_pretrained(str(self.best_dir))
+            console.print(f"🏅 新的最佳{self.metric_name}: {value:.6f} (step {state.global_step}) -> {self.best_dir}")
+
+
+def build_lora_model(config: Dict):
+    """加载4-bit基座模型并挂载LoRA"""
+    console.print(f"🤖 加载模型: {config['model_name']}")
+
+    model, tokenizer = FastLanguageModel.from_pretrained(
+        model_name=config["model_name"],
+        max_seq_length=config["max_seq_length"],
+        dtype=config["dtype"],
+        load_in_4bit=config["load_in_4bit"],
+    )
+
+    model = FastLanguageModel.get_peft_model(
+        model,
+        r=config["lora_r"],
+        alpha=config["lora_alpha"],
+        target_modules=config["target_modules"],
+        lora_dropout=config["lora_dropout"],
+        bias=config["lora_bias"],
+        use_gradient_checkpointing="unsloth" if config["gradient_checkpointing"] else False,
+        random_state=config["seed"],
+    )
+
+    # 编译缓存上限 (torch.compile由Trainer在训练时应用)
+    torch._dynamo.config.cache_size_limit = 64
+
+    # packing依赖EOS分隔样本
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    console.print("✅ 模型和LoRA配置完成")
+    model.print_trainable_parameters()
+
+    return model, tokenizer
+
+
+# harmony格式模板片段: (user前缀, instruction与input分隔, assistant前缀, 回复结尾)
+HARMONY_TEMPLATE = ("<|user|>\n", "\n\n", "<|end|>\n<|assistant|>\n", "<|end|>")
+# 分词输出的列结构版本，改变build_tokenize_fn产出的列时递增，使旧缓存失效
+TOKENIZE_VERSION = 2
+
+
+def tokenized_cache_key(config: Dict) -> str:
+    """分词缓存的键: 模型(分词器)、截断长度、模板和列结构任一变化都对应新的缓存目录"""
+    spec = {
+        "model_name": config["model_name"],
+        "max_seq_length": config["max_seq_length"],
+        "template": HARMONY_TEMPLATE,
+        "version": TOKENIZE_VERSION,
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def build_tokenize_fn(tokenizer, max_seq_length: int):
+    """构建ID级别拼接的分词函数 (GPT-OSS-20B harmony格式)
+
+    模板骨架只编码一次，每个样本只分词instruction/input/output三段；
+    completion_mask标记assistant回复，prompt部分不计入loss。
+    """
+    def encode(text):
+        return tokenizer(text, add_special_tokens=False)["input_ids"]
+
+    prefix_ids = tokenizer("")["input_ids"]  # BOS等特殊前缀
+    user_ids, sep_ids, assistant_ids, end_ids = map(encode, HARMONY_TEMPLATE)
+
+    def tokenize_batch(examples):
+        instructions = tokenizer(examples["instruction"], add_special_tokens=False)["input_ids"]
+        inputs = tokenizer(examples["input"], add_special_tokens=False)["input_ids"]
+        outputs = tokenizer(examples["output"], add_special_tokens=False)["input_ids"]
+
+        batch = {"input_ids": [], "attention_mask": [], "completion_mask": []}
+        for instruction_ids, input_text, input_ids, output_ids in zip(
+            instructions, examples["input"], inputs, outputs
+        ):
+            prompt = prefix_ids + user_ids + instruction_ids
+            if input_text.strip():
+                prompt += sep_ids + input_ids
+            prompt += assistant_ids
+            completion = output_ids + end_ids
+
+            ids = (prompt + completion)[:max_seq_length]
+            mask = ([0] * len(prompt) + [1] * len(completion))[:max_seq_length]
+            batch["input_ids"].append(ids)
+            batch["attention_mask"].append([1] * len(ids))
+            batch["completion_mask"].append(mask)
+        return batch
+
+    return tokenize_batch
+
+
+def load_tokenized(data_dir, tokenizer, config: Dict, model=None) -> Dict[str, Dataset]:
+    """加载预分词数据集，缓存不存在时才读取JSONL并分词
+
+    缓存按split保存在 data_dir/tok_{split}_{key}，两个训练入口共用；
+    key见tokenized_cache_key，换模型、截断长度或模板后不会误用旧缓存。
+    训练集会按p99长度收紧config["max_seq_length"]。
+    """
+    console.print("📁 加载训练数据集...")
+    data_dir = Path(data_dir)
+    tokenize_batch = None
+    cache_key = tokenized_cache_key(config)
+
+    tokenized = {}
+    for split in ("train", "validation"):
+        cache_dir = data_dir / f"tok_{split}_{cache_key}"
+        if cache_dir.exists():
+            tokenized[split] = load_from_disk(str(cache_dir))
+            console.print(f"  ♻️ 加载分词缓存: {cache_dir} ({len(tokenized[split]):,} 样本)")
+            continue
+
+        data_file = data_dir / f"{split}.jsonl"
+        if not data_file.exists():
+            if split == "train":
+                raise FileNotFoundError(f"训练文件不存在: {data_file}")
+            continue
+
+        # Arrow原生JSON解析，内存映射，无pandas中间拷贝
+        dataset = load_dataset("json", data_files=str(data_file), split="train", num_proc=4)
+        if tokenize_batch is None:
+            tokenize_batch = build_tokenize_fn(tokenizer, config["max_seq_length"])
+
+        tokenized[split] = dataset.map(
+            tokenize_batch,
+            batched=True,
+            num_proc=config["dataset_num_proc"],
+            remove_columns=dataset.column_names,
+        )
+        tokenized[split].save_to_disk(str(cache_dir))
+        console.print(f"  💾 分词缓存已保存: {cache_dir} ({len(tokenized[split]):,} 样本)")
+
+    # 序列长度按数据实际分布收紧，注意力开销随长度平方下降
+    tokenized["train"] = fit_max_seq_length(tokenized["train"], config, model)
+
+    if config["group_by_length"]:
+        tokenized["train"] = tokenized["train"].map(
+            lambda x: {"length": len(x["input_ids"])},
+            num_proc=config["dataset_num_proc"],
+        )
+
+    return tokenized
+
+
+def fit_max_seq_length(dataset: Dataset, config: Dict, model=None) -> Dataset:
+    """按训练集p99长度收紧max_seq_length (64对齐)，丢弃超长的≤1%样本"""
+    lengths = np.fromiter((len(ids) for ids in dataset["input_ids"]), dtype=np.int64, count=len(dataset))
+    p99 = int(np.quantile(lengths, 0.99))
+    max_seq_length = min(config["max_seq_length"], max(256, ((p99 + 63) // 64) * 64))
+
+    if max_seq_length < config["max_seq_length"]:
+        keep = np.flatnonzero(lengths <= max_seq_length)
+        console.print(
+            f"✂️ max_seq_length: {config['max_seq_length']} -> {max_seq_length} "
+            f"(p99={p99}, 丢弃 {len(dataset) - len(keep)} 个超长样本)"
+        )
+        dataset = dataset.select(keep)
+        config["max_seq_length"] = max_seq_length
+        if model is not None:
+            model.max_seq_length = max_seq_length
+
+    return dataset
+
+
+def build_optimizer(model, config: Dict):
+    """构建分页AdamW8bit优化器: bias和LayerNorm等1维参数不做权重衰减"""
+    import bitsandbytes as bnb
+
+    decay_params, nodecay_params = [], []
+    for _, param in model.named_parameters():
+        if not param.requires_grad:
+            continue
+        (decay_params if param.dim() >= 2 else nodecay_params).append(param)
+
+    return bnb.optim.PagedAdamW8bit(
+        [
+            {"params": decay_params, "weight_decay": config["weight_decay"]},
+            {"params": nodecay_params, "weight_decay": 0.0},
+        ],
+        lr=config["learning_rate"],
+    )
+
+
+def make_training_args(config: Dict, output_dir) -> SFTConfig:
+    """由配置字典构建SFTConfig"""
+    return SFTConfig(
+        output_dir=str(output_dir),
+        per_device_train_batch_size=config["per_device_train_batch_size"],
+        per_device_eval_batch_size=config["per_device_eval_batch_size"],
+        gradient_accumulation_steps=config["gradient_accumulation_steps"],
+        learning_rate=config["learning_rate"],
+        num_train_epochs=config["num_train_epochs"],
+        max_steps=config["max_steps"],
+        warmup_steps=config["warmup_steps"],
+        weight_decay=config["weight_decay"],
+        lr_scheduler_type=config["lr_scheduler_type"],
+        seed=config["seed"],
+        optim=config["optim"],
+        fp16=config["fp16"],
+        bf16=config["bf16"],
+        gradient_checkpointing=config["gradient_checkpointing"],
+        gradient_checkpointing_kwargs={"use_reentrant": False},  # 非重入checkpoint，反向不重建前向图
+        dataloader_pin_memory=config["dataloader_pin_memory"],
+        dataloader_num_workers=config["dataloader_num_workers"],
+        dataloader_persistent_workers=config["dataloader_persistent_workers"],
+        group_by_length=config["group_by_length"],
+        length_column_name="length",
+        torch_compile=config["torch_compile"],
+        torch_compile_mode=config["torch_compile_mode"],
+        eval_steps=config["eval_steps"],
+        save_steps=config["save_steps"],
+        logging_steps=config["logging_steps"],
+        eval_strategy=config["evaluation_strategy"],  # 新版本使用eval_strategy
+        save_strategy=config["save_strategy"],
+        load_best_model_at_end=config["load_best_model_at_end"],
+        metric_for_best_model=config["metric_for_best_model"],
+        greater_is_better=config["greater_is_better"],
+        save_total_limit=config["save_total_limit"],
+        report_to=config["report_to"],
+        run_name=config["run_name"],
+        remove_unused_columns=False,
+        max_length=config["max_seq_length"],
+        packing=config["packing"],  # 短样本拼接成max_seq_length块，减少padding浪费
+        packing_strategy=config["packing_strategy"],
+        completion_only_loss=True,  # 按completion_mask只对assistant回复计算loss
+        dataset_num_proc=config["dataset_num_proc"],
+    )
+
+
+def build_trainer(model, tokenizer, datasets: Dict[str, Dataset], config: Dict, output_dir) -> SFTTrainer:
+    """设置SFT训练器"""
+    console.print("🏋️ 设置SFT训练器...")
+
+    trainer = SFTTrainer(
+        model=model,
+        args=make_training_args(config, output_dir),
+        train_dataset=datasets["train"],
+        eval_dataset=datasets.get("validation"),
+        processing_class=tokenizer,
+        optimizers=(build_optimizer(model, config), None),
+        callbacks=[SaveBestAdapterCallback(
+            output_dir,
+            metric_name=config["metric_for_best_model"],
+            greater_is_better=config["greater_is_better"],
+        )],
+    )
+
+    console.print("✅ SFT训练器配置完成")
+    return trainer
+
+
+def warmup_allocator(model, tokenizer, config: Dict):
+    """用最大长度的空批次预热CUDA缓存分配器，后续步骤直接复用显存块"""
+    console.print("🔥 预热显存分配器...")
+    try:
+        ids = torch.full(
+            (config["per_device_train_batch_size"], config["max_seq_length"]),
+            tokenizer.pad_token_id,
+            device="cuda",
+        )
+        loss = model(input_ids=ids, labels=ids).loss
+        loss.backward()
+        model.zero_grad(set_to_none=True)
+        torch.cuda.synchronize()
+        console.print(f"✅ 预热完成: 已保留 {torch.cuda.memory_reserved() / 1e9:.1f}GB")
+    except Exception as e:
+        # 显存较小的GPU上跳过预热
+        model.zero_grad(set_to_none=True)
+        torch.cuda.empty_cache()
+        console.print(f"⚠️ 跳过预热: {e}")
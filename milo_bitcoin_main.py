@@ -3,13 +3,22 @@
 # The first AI cat to understand Bitcoin! - Created by Norton Gu
 
 import os
+import time
 import asyncio
+import functools
+import numbers
+import re
+from bisect import bisect_left, bisect_right
+from itertools import chain
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Final
 import json
-import requests
+import logging
+import httpx  # http2=True requires the h2 extra: pip install 'httpx[http2]'
 from dataclasses import dataclass
 
+log = logging.getLogger(__name__)
+
 # Load environment variables from .env file
 try:
     from dotenv import load_dotenv
@@ -18,7 +27,200 @@ try:
 except ImportError:
     print("⚠️ python-dotenv not installed. Using system environment variables only.")
 
-@dataclass
+# Fast JSON parsing for API responses (falls back to stdlib json)
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Lazy on-demand parsing for large payloads (NewsAPI); optional
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# Incremental parsing of the NewsAPI body while it streams in; optional
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+class _AsyncByteReader:
+    """Adapts an httpx streaming response to the async read() interface ijson expects"""
+    
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+    
+    async def read(self, size: int = -1) -> bytes:
+        try:
+            return await anext(self._chunks)
+        except StopAsyncIteration:
+            return b''
+
+# Vector index for the RAG knowledge base and the model that embeds into it; optional
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+# Typed, schema-specialized decoding of CoinGecko / Fear & Greed responses; optional
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if msgspec is not None:
+    class _UsdValue(msgspec.Struct):
+        usd: float
+    
+    class _MarketData(msgspec.Struct):
+        current_price: _UsdValue
+        market_cap: _UsdValue
+        total_volume: _UsdValue
+    
+    class CoinResponse(msgspec.Struct):
+        """/coins/bitcoin payload, decoding only market_data (other fields are skipped)"""
+        market_data: _MarketData
+    
+    class _FearGreedEntry(msgspec.Struct):
+        value: int
+        value_classification: str
+        timestamp: str
+    
+    class FearGreedResponse(msgspec.Struct):
+        data: List[_FearGreedEntry]
+    
+    def _decode(content: bytes, type_):
+        # strict=False lets the API's numeric strings ("45") decode into int fields
+        try:
+            return msgspec.json.decode(content, type=type_, strict=False)
+        except msgspec.ValidationError as e:
+            raise ValueError(str(e)) from e
+
+# Fear & Greed index (<25, <45, <55, <75, rest) and daily tx count (>200k, >300k) labels
+_FG_BOUNDS = (25, 45, 55, 75)
+_FG_LABELS = ('Extreme Fear', 'Fear', 'Neutral', 'Greed', 'Extreme Greed')
+_TX_BOUNDS = (200000, 300000)
+_TX_LABELS = ('Low', 'Medium', 'High')
+
+def classify_market(fear_greed_index, transaction_count):
+    """Sentiment and activity labels for one snapshot, or label arrays for many
+    
+    Scalars use bisect; arrays (historical snapshots, several assets) go through
+    the vectorized classifier in milo_bitcoin_numeric with the same bounds.
+    """
+    if isinstance(fear_greed_index, numbers.Real) and isinstance(transaction_count, numbers.Real):
+        return (_FG_LABELS[bisect_right(_FG_BOUNDS, fear_greed_index)],
+                _TX_LABELS[bisect_left(_TX_BOUNDS, transaction_count)])
+    # Imported on first batch so the chat path doesn't need NumPy/Numba
+    from milo_bitcoin_numeric import label_batch
+    return label_batch(fear_greed_index, transaction_count, _FG_BOUNDS, _FG_LABELS, _TX_BOUNDS, _TX_LABELS)
+
+_API_TIMEOUT = 5.0  # Per-API deadline (seconds) for the metric fetchers
+_SAT_TO_BTC = 1e-8  # blockchain.info reports total_fees_btc in satoshi
+
+# Constant API query parameters
+_COINGECKO_COIN_PARAMS = {
+    'localization': 'false',
+    'tickers': 'false',
+    'community_data': 'false',
+    'developer_data': 'false',
+    'sparkline': 'false'
+}
+_FG_PARAMS = {'limit': 1, 'format': 'json'}
+_NEWS_BASE_PARAMS = {
+    'q': 'bitcoin OR BTC',
+    'language': 'en',
+    'sortBy': 'publishedAt'
+}
+
+# Prebuilt knowledge index (written by BitcoinRAGSystem.build_knowledge_base)
+_KNOWLEDGE_INDEX = "rag_data/knowledge.faiss"
+_KNOWLEDGE_META = "rag_data/knowledge_meta.json"
+_KNOWLEDGE_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Article fields kept from the NewsAPI response (same shape whichever JSON parser is installed)
+_NEWS_FIELDS = ('title', 'url', 'publishedAt', 'source')
+
+def _news_article(article) -> Dict:
+    """Trim a NewsAPI article to _NEWS_FIELDS"""
+    return {field: article.get(field) for field in _NEWS_FIELDS}
+
+# Response fields actually consumed by collect_comprehensive_data (name -> JSON pointer)
+_PRICE_POINTERS = {
+    'usd': '/market_data/current_price/usd',
+    'usd_market_cap': '/market_data/market_cap/usd',
+    'usd_24h_vol': '/market_data/total_volume/usd'
+}
+_ON_CHAIN_POINTERS = {
+    field: f'/{field}'
+    for field in ('n_tx', 'hash_rate', 'difficulty', 'total_fees_btc', 'n_btc_discovered')
+}
+
+# Fields each response must carry
+_REQUIRED_PRICE = frozenset({'usd', 'usd_market_cap', 'usd_24h_vol'})
+_REQUIRED_ON_CHAIN = frozenset({'n_tx', 'hash_rate', 'difficulty', 'total_fees_btc'})
+_REQUIRED_FG = frozenset({'value', 'value_classification', 'timestamp'})
+
+_CONTEXT_TEMPLATE = """
+Current Bitcoin Data:
+- Price: ${price}
+- Market Cap: ${market_cap}
+- 24h Volume: ${volume_24h}
+- Fear & Greed Index: {fear_greed_index}/100
+- Hash Rate: {hash_rate}
+- Daily Transactions: {transaction_count}
+
+Market Analysis Context:
+- Current market sentiment: {sentiment}
+- Network activity: {activity}
+"""
+
+_SUMMARY_TEMPLATE = """🐱₿ Milo's Bitcoin Market Summary
+
+💰 Price: ${price}
+📊 Market Cap: ${market_cap}
+📈 24h Volume: ${volume_24h}
+😰 Fear & Greed: {fear_greed_index}/100
+⛓️ Hash Rate: {hash_rate}
+💸 Network Fees: ${fees_usd}
+
+*Updated: {updated} UTC*
+*For educational purposes only! 🐾*"""
+
+def ttl_cache(seconds: float):
+    """Cache an async collector method's result on the instance for `seconds`.
+    
+    A per-key asyncio.Lock makes concurrent callers share one upstream fetch
+    (single-flight). Empty results (failed fetches) are not cached, so the
+    next call retries.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            key = (func.__name__, *args, *sorted(kwargs.items()))
+            cached = self._cache.get(key)
+            if cached is not None and time.monotonic() < cached[0]:
+                return cached[1]
+            async with self._cache_locks.setdefault(key, asyncio.Lock()):
+                # Another caller may have filled the entry while we waited
+                cached = self._cache.get(key)
+                if cached is not None and time.monotonic() < cached[0]:
+                    return cached[1]
+                value = await func(self, *args, **kwargs)
+                if value:
+                    self._cache[key] = (time.monotonic() + seconds, value)
+                return value
+        return wrapper
+    return decorator
+
+@dataclass(slots=True, frozen=True)
 class BitcoinMetrics:
     """Bitcoin's core data structure"""
     price: float
@@ -29,6 +231,25 @@ class BitcoinMetrics:
     active_addresses: int
     transaction_count: int
     fees_usd: float
+    
+    def formatted(self) -> Dict[str, str]:
+        """Display strings for every field, formatted once per snapshot"""
+        return _formatted_metrics(self)
+
+@functools.lru_cache(maxsize=128)
+def _formatted_metrics(metrics: BitcoinMetrics) -> Dict[str, str]:
+    sentiment, activity = classify_market(metrics.fear_greed_index, metrics.transaction_count)
+    return {
+        'price': f'{metrics.price:,.2f}',
+        'market_cap': f'{metrics.market_cap:,.0f}',
+        'volume_24h': f'{metrics.volume_24h:,.0f}',
+        'fear_greed_index': str(metrics.fear_greed_index),
+        'hash_rate': str(metrics.hash_rate),
+        'transaction_count': f'{metrics.transaction_count:,}',
+        'fees_usd': f'{metrics.fees_usd:.2f}',
+        'sentiment': sentiment,
+        'activity': activity,
+    }
 
 class BitcoinDataCollector:
     """Specialized Bitcoin data collector"""
@@ -46,181 +267,261 @@ class BitcoinDataCollector:
         
         self.news_api_key = os.getenv('NEWS_API_KEY')
         
-        # Request session for connection pooling
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Milo-Bitcoin-Assistant/1.0',
-            'Accept': 'application/json'
-        })
+        # Async HTTP/2 client: keep-alive pooling, real concurrency under asyncio.gather
+        self.client = httpx.AsyncClient(
+            http2=True,
+            headers={
+                'User-Agent': 'Milo-Bitcoin-Assistant/1.0',
+                'Accept': 'application/json'
+            },
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+        )
         
-        # Cache for latest data
-        self.latest_news = []
+        # Reused simdjson parser (keeps its internal buffers across calls)
+        self._sj = simdjson.Parser() if simdjson else None
+        
+        # TTL cache for API responses: (function name, args) -> (expiry, value)
+        self._cache: Dict[tuple, tuple] = {}
+        self._cache_locks: Dict[tuple, asyncio.Lock] = {}
+        
+        # Cache for latest data (news is fetched off the critical path)
+        self._news_task: Optional[asyncio.Task] = None
+        self._latest_news: List[Dict] = []
     
-    def close(self):
+    async def aclose(self):
         """Clean up resources"""
-        if hasattr(self, 'session'):
-            self.session.close()
+        if self._news_task is not None and not self._news_task.done():
+            self._news_task.cancel()
+        if hasattr(self, 'client'):
+            await self.client.aclose()
+    
+    def _extract_fields(self, content: bytes, pointers: Dict[str, str]) -> Dict:
+        """Parse a JSON body into a slim dict of `name -> value at JSON pointer`.
+        
+        Pointers that don't resolve are left out of the result.
+        """
+        if self._sj is not None:
+            doc = self._sj.parse(content)
+            fields = {}
+            for name, pointer in pointers.items():
+                try:
+                    fields[name] = doc.at_pointer(pointer)
+                except (KeyError, IndexError, TypeError):
+                    pass
+            return fields
+        
+        doc = json_loads(content)
+        fields = {}
+        for name, pointer in pointers.items():
+            value = doc
+            for key in pointer.split('/')[1:]:
+                if not isinstance(value, dict) or key not in value:
+                    break
+                value = value[key]
+            else:
+                fields[name] = value
+        return fields
     
+    @ttl_cache(seconds=30)
     async def get_bitcoin_price_data(self) -> Dict:
         """Get Bitcoin price and market data from CoinGecko"""
         try:
-            url = f"{self.coingecko_api}/simple/price"
-            params = {
-                'ids': 'bitcoin',
-                'vs_currencies': 'usd',
-                'include_market_cap': 'true',
-                'include_24hr_vol': 'true',
-                'include_24hr_change': 'true',
-                'include_last_updated_at': 'true'
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
+            # One /coins/bitcoin call covers price, market cap and volume
+            url = f"{self.coingecko_api}/coins/bitcoin"
+            response = await self.client.get(url, params=_COINGECKO_COIN_PARAMS)
             response.raise_for_status()  # Raise exception for bad status codes
             
-            data = response.json()
-            
-            # Data validation
-            if 'bitcoin' not in data:
-                raise ValueError("Bitcoin data not found in response")
+            # Keep only the fields read downstream
+            if msgspec is not None:
+                market = _decode(response.content, CoinResponse).market_data
+                bitcoin_data = {
+                    'usd': market.current_price.usd,
+                    'usd_market_cap': market.market_cap.usd,
+                    'usd_24h_vol': market.total_volume.usd
+                }
+            else:
+                bitcoin_data = self._extract_fields(response.content, _PRICE_POINTERS)
+            if not bitcoin_data:
+                raise ValueError("Bitcoin market data not found in response")
                 
-            bitcoin_data = data['bitcoin']
-            required_fields = ['usd', 'usd_market_cap', 'usd_24h_vol']
-            for field in required_fields:
-                if field not in bitcoin_data:
-                    raise ValueError(f"Required field '{field}' missing from response")
+            if missing := _REQUIRED_PRICE - bitcoin_data.keys():
+                raise ValueError(f"Required fields {sorted(missing)} missing from response")
             
-            print("📈 Milo fetched Bitcoin price data successfully")
-            return data
+            log.debug("📈 Milo fetched Bitcoin price data successfully")
+            return {'bitcoin': bitcoin_data}
             
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Network error fetching price data: {e}")
+        except httpx.HTTPError as e:
+            log.error("❌ Network error fetching price data: %s", e)
             return {}
         except ValueError as e:
-            print(f"❌ Data validation error: {e}")
+            log.error("❌ Data validation error: %s", e)
             return {}
         except Exception as e:
-            print(f"❌ Unexpected error fetching price data: {e}")
+            log.error("❌ Unexpected error fetching price data: %s", e)
             return {}
 
+    @ttl_cache(seconds=300)  # Stats change per block (~10 min)
     async def get_on_chain_metrics(self) -> Dict:
         """Get Bitcoin on-chain metrics from Blockchain.info"""
         try:
             # Get basic stats
             stats_url = self.blockchain_info_api
-            response = self.session.get(stats_url, timeout=10)
+            response = await self.client.get(stats_url)
             response.raise_for_status()
             
-            stats_data = response.json()
+            # Keep only the fields read downstream (the stats payload has ~30 keys)
+            stats_data = self._extract_fields(response.content, _ON_CHAIN_POINTERS)
             
             # Get additional mempool data
             mempool_url = "https://api.blockchain.info/mempool/fees"
-            mempool_response = self.session.get(mempool_url, timeout=10)
+            mempool_response = await self.client.get(mempool_url)
             mempool_response.raise_for_status()
-            mempool_data = mempool_response.json()
+            mempool_data = json_loads(mempool_response.content)
             
             # Combine data
-            combined_data = {
-                **stats_data,
-                'mempool_fees': mempool_data
-            }
+            stats_data['mempool_fees'] = mempool_data
             
             # Data validation
-            required_fields = ['n_tx', 'hash_rate', 'difficulty', 'total_fees_btc']
-            for field in required_fields:
-                if field not in stats_data:
-                    print(f"⚠️ Warning: '{field}' not found in blockchain.info response")
+            if missing := _REQUIRED_ON_CHAIN - stats_data.keys():
+                log.warning("⚠️ Warning: %s not found in blockchain.info response", sorted(missing))
             
-            print("⛓️ Milo fetched on-chain metrics successfully")
-            return combined_data
+            log.debug("⛓️ Milo fetched on-chain metrics successfully")
+            return stats_data
             
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Network error fetching on-chain data: {e}")
+        except httpx.HTTPError as e:
+            log.error("❌ Network error fetching on-chain data: %s", e)
             return {}
         except ValueError as e:
-            print(f"❌ JSON parsing error: {e}")
+            log.error("❌ JSON parsing error: %s", e)
             return {}
         except Exception as e:
-            print(f"❌ Unexpected error fetching on-chain data: {e}")
+            log.error("❌ Unexpected error fetching on-chain data: %s", e)
             return {}
     
+    @ttl_cache(seconds=3600)  # Index only updates daily
     async def get_fear_greed_index(self) -> Dict:
         """Get Crypto Fear & Greed Index from Alternative.me"""
         try:
-            url = f"{self.fear_greed_api}?limit=1&format=json"
-            response = self.session.get(url, timeout=10)
+            response = await self.client.get(self.fear_greed_api, params=_FG_PARAMS)
             response.raise_for_status()
             
-            data = response.json()
+            if msgspec is not None:
+                entries = _decode(response.content, FearGreedResponse).data
+                data = {'data': [msgspec.structs.asdict(entry) for entry in entries[:1]]}
+            else:
+                data = json_loads(response.content)
             
             # Data validation
             if 'data' not in data or not data['data']:
                 raise ValueError("No fear & greed data found in response")
             
             fear_greed_data = data['data'][0]
-            required_fields = ['value', 'value_classification', 'timestamp']
-            for field in required_fields:
-                if field not in fear_greed_data:
-                    raise ValueError(f"Required field '{field}' missing from fear & greed response")
+            if missing := _REQUIRED_FG - fear_greed_data.keys():
+                raise ValueError(f"Required fields {sorted(missing)} missing from fear & greed response")
             
             # Validate value range
             value = int(fear_greed_data['value'])
             if not 0 <= value <= 100:
                 raise ValueError(f"Fear & greed value {value} out of valid range (0-100)")
             
-            print(f"😰 Milo checked market sentiment: {fear_greed_data['value_classification']} ({value}/100)")
+            log.debug("😰 Milo checked market sentiment: %s (%d/100)", fear_greed_data['value_classification'], value)
             return data
             
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Network error fetching fear/greed index: {e}")
+        except httpx.HTTPError as e:
+            log.error("❌ Network error fetching fear/greed index: %s", e)
             return {}
         except ValueError as e:
-            print(f"❌ Data validation error: {e}")
+            log.error("❌ Data validation error: %s", e)
             return {}
         except Exception as e:
-            print(f"❌ Unexpected error fetching fear/greed index: {e}")
+            log.error("❌ Unexpected error fetching fear/greed index: %s", e)
             return {}
     
+    @ttl_cache(seconds=600)
     async def get_bitcoin_news(self, limit: int = 10) -> List[Dict]:
         """Get Bitcoin related news"""
         try:
             if not self.news_api_key:
-                print("⚠️ No News API key found")
+                log.warning("⚠️ No News API key found")
                 return []
             
             url = "https://newsapi.org/v2/everything"
-            params = {
-                'q': 'bitcoin OR BTC',
-                'apiKey': self.news_api_key,
-                'language': 'en',
-                'sortBy': 'publishedAt',
-                'pageSize': limit
-            }
-            response = self.session.get(url, params=params, timeout=10)
-            print(f"🗞️ Milo collected {limit} Bitcoin news articles")
-            return response.json().get('articles', [])
+            params = {**_NEWS_BASE_PARAMS, 'apiKey': self.news_api_key, 'pageSize': limit}
+            if ijson is not None:
+                # Stream the body and keep only a few fields of the first `limit` articles
+                articles = []
+                async with self.client.stream('GET', url, params=params) as response:
+                    async for article in ijson.items_async(_AsyncByteReader(response), 'articles.item'):
+                        articles.append(_news_article(article))
+                        if len(articles) >= limit:
+                            break
+                log.debug("🗞️ Milo collected %d Bitcoin news articles", len(articles))
+                return articles
+            
+            response = await self.client.get(url, params=params)
+            log.debug("🗞️ Milo collected %d Bitcoin news articles", limit)
+            if self._sj is not None:
+                # Only materialize the 'articles' field, skip the rest of the document
+                doc = self._sj.parse(response.content)
+                try:
+                    articles = doc.at_pointer('/articles').as_list()
+                except KeyError:
+                    return []
+            else:
+                articles = json_loads(response.content).get('articles', [])
+            return [_news_article(article) for article in articles]
         except Exception as e:
-            print(f"❌ Error fetching news: {e}")
+            log.error("❌ Error fetching news: %s", e)
             return []
     
+    async def get_latest_news(self) -> List[Dict]:
+        """Latest news from the last refresh, awaiting the background fetch if needed"""
+        if self._news_task is not None:
+            try:
+                news_data = await self._news_task
+            except Exception as e:
+                log.warning("⚠️ NewsAPI API failed: %s", e)
+                news_data = []
+            self._latest_news = news_data if isinstance(news_data, list) else []
+            self._news_task = None
+        return self._latest_news
+    
+    async def _fetch_with_timeout(self, name: str, fetch) -> Dict:
+        """Run one fetcher under _API_TIMEOUT; a timeout yields an empty result"""
+        try:
+            return await asyncio.wait_for(fetch(), _API_TIMEOUT)
+        except asyncio.TimeoutError:
+            log.warning("⚠️ %s API timed out after %ss", name, _API_TIMEOUT)
+            return {}
+    
     async def collect_comprehensive_data(self) -> BitcoinMetrics:
         """Collect comprehensive Bitcoin data"""
-        print("🔄 Milo is collecting comprehensive Bitcoin data...")
+        log.info("🔄 Milo is collecting comprehensive Bitcoin data...")
         
         try:
-            # Get all data in parallel
-            price_data, on_chain_data, sentiment_data, news_data = await asyncio.gather(
-                self.get_bitcoin_price_data(), # CoinGecko API
-                self.get_on_chain_metrics(), # Blockchain.info API
-                self.get_fear_greed_index(), # Alternative.me API
-                self.get_bitcoin_news(), # NewsAPI
-                return_exceptions=True  # Don't fail if one API fails
-            )
+            # News isn't part of the metrics: fetch it in the background (NewsAPI)
+            if self._news_task is None or self._news_task.done():
+                self._news_task = asyncio.create_task(self.get_bitcoin_news())
             
-            # Check for exceptions in parallel execution
-            for i, result in enumerate([price_data, on_chain_data, sentiment_data, news_data]):
+            # Get metric data in parallel; each API gets its own deadline and a
+            # failing API only empties its own result
+            fetchers = (
+                ('CoinGecko', self.get_bitcoin_price_data), # CoinGecko API
+                ('Blockchain.info', self.get_on_chain_metrics), # Blockchain.info API
+                ('Fear&Greed', self.get_fear_greed_index), # Alternative.me API
+            )
+            results = await asyncio.gather(
+                *(self._fetch_with_timeout(name, fetch) for name, fetch in fetchers),
+                return_exceptions=True
+            )
+            for (name, _), result in zip(fetchers, results):
                 if isinstance(result, Exception):
-                    api_names = ['CoinGecko', 'Blockchain.info', 'Fear&Greed', 'NewsAPI']
-                    print(f"⚠️ {api_names[i]} API failed: {result}")
+                    log.warning("⚠️ %s API fetch failed: %r", name, result)
+            
+            price_data, on_chain_data, sentiment_data = (
+                {} if isinstance(result, Exception) else result for result in results
+            )
             
             # Safe data parsing with defaults
             bitcoin_price = price_data.get('bitcoin', {}) if isinstance(price_data, dict) else {}
@@ -240,18 +541,17 @@ class BitcoinDataCollector:
                 fear_greed_index=int(fear_greed.get('value', 50)),
                 active_addresses=int(safe_on_chain.get('n_btc_discovered', 0)),
                 transaction_count=int(safe_on_chain.get('n_tx', 0)),
-                fees_usd=abs(float(safe_on_chain.get('total_fees_btc', 0))) * float(bitcoin_price.get('usd', 0)) / 100000000  # Convert satoshi to BTC and take absolute value
+                fees_usd=abs(float(safe_on_chain.get('total_fees_btc', 0))) * float(bitcoin_price.get('usd', 0)) * _SAT_TO_BTC  # Convert satoshi to BTC and take absolute value
             )
             
-            # Store news data for potential future use
-            self.latest_news = news_data if isinstance(news_data, list) else []
-            
-            print("✅ Milo gathered all Bitcoin data successfully!")
-            print(f"📊 Price: ${metrics.price:,.2f} | Sentiment: {metrics.fear_greed_index}/100 | Txs: {metrics.transaction_count:,}")
+            log.info("✅ Milo gathered all Bitcoin data successfully!")
+            # Display strings are cached on the snapshot and keep the thousands separators
+            shown = metrics.formatted()
+            log.info("📊 Price: $%s | Sentiment: %s/100 | Txs: %s", shown['price'], shown['fear_greed_index'], shown['transaction_count'])
             return metrics
             
         except Exception as e:
-            print(f"❌ Critical error in data collection: {e}")
+            log.error("❌ Critical error in data collection: %s", e)
             # Return default metrics if everything fails
             return BitcoinMetrics(
                 price=0, market_cap=0, volume_24h=0, hash_rate=0,
@@ -259,6 +559,18 @@ class BitcoinDataCollector:
                 transaction_count=0, fees_usd=0
             )
 
+@functools.lru_cache(maxsize=128)
+def _render_context(metrics: BitcoinMetrics) -> str:
+    """Context block for a metrics snapshot (frozen, so usable as a cache key)"""
+    return _CONTEXT_TEMPLATE.format_map(metrics.formatted())
+
+_WORD_RE = re.compile(r"\w+")
+
+def _shingles(text: str) -> frozenset:
+    """Lowercased word 1- and 2-shingles as tuples, so one-word queries still overlap"""
+    words = _WORD_RE.findall(text.lower())
+    return frozenset(chain(zip(words), zip(words, words[1:])))
+
 class BitcoinRAGSystem:
     """Bitcoin's specialized RAG system"""
     
@@ -266,9 +578,23 @@ class BitcoinRAGSystem:
         self.vectorstore = None
         self.embeddings = None
         self.bitcoin_knowledge_base = []
+        self._knowledge_shingles: List[frozenset] = []
         
     def load_bitcoin_knowledge(self):
         """Load Bitcoin's knowledge database"""
+        # Prebuilt index: memory-mapped, pages load on demand, no re-embedding at startup
+        if (faiss is not None and SentenceTransformer is not None
+                and os.path.exists(_KNOWLEDGE_INDEX) and os.path.exists(_KNOWLEDGE_META)):
+            with open(_KNOWLEDGE_META, encoding='utf-8') as f:
+                meta = json.load(f)
+            # Query vectors must come from the model that embedded the documents
+            if meta.get('embedding_model') == _KNOWLEDGE_EMBED_MODEL:
+                print("📚 Milo is loading Bitcoin knowledge index...")
+                self.vectorstore = faiss.read_index(_KNOWLEDGE_INDEX, faiss.IO_FLAG_MMAP)
+                self.bitcoin_knowledge_base = meta['documents']
+                self._knowledge_shingles = [_shingles(doc) for doc in self.bitcoin_knowledge_base]
+                return self.bitcoin_knowledge_base
+        
         knowledge_sources = [
             "Bitcoin Whitepaper by Satoshi Nakamoto", # Bitcoin white paper
             "Technical analysis indicators for Bitcoin", # Bitcoin technical analysis indicators
@@ -280,44 +606,84 @@ class BitcoinRAGSystem:
         
         print("📚 Milo is loading Bitcoin knowledge base...")
         self.bitcoin_knowledge_base = knowledge_sources
+        self._knowledge_shingles = [_shingles(doc) for doc in knowledge_sources]
         return knowledge_sources
         
-    def build_knowledge_base(self, documents: List[str]):
-        """Building a Bitcoin-specific knowledge base"""
+    def _embed(self, texts: List[str]):
+        """Normalized float32 embeddings from _KNOWLEDGE_EMBED_MODEL (loaded on first use)"""
+        if self.embeddings is None:
+            self.embeddings = SentenceTransformer(_KNOWLEDGE_EMBED_MODEL)
+        return self.embeddings.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype('float32')
+    
+    def build_knowledge_base(self, documents: List[str], embeddings=None):
+        """Building a Bitcoin-specific knowledge base
+        
+        `embeddings` is an (n_docs, dim) float32 array of normalized vectors from
+        _KNOWLEDGE_EMBED_MODEL; when omitted the documents are embedded here. The
+        vectors are stored once as an int8 scalar-quantized FAISS index plus a JSON
+        sidecar of the documents, which load_bitcoin_knowledge memory-maps on later
+        starts and search_knowledge queries.
+        """
         print("🔨 Milo is building Bitcoin knowledge base...")
-        # TODO: Implement vector database construction
         # Will include: Bitcoin white paper, technical analysis, market cycle, mining knowledge, etc.
+        if faiss is None or (embeddings is None and SentenceTransformer is None):
+            return
+        if embeddings is None:
+            embeddings = self._embed(list(documents))
+        
+        index = faiss.IndexScalarQuantizer(
+            embeddings.shape[1], faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(embeddings)
+        index.add(embeddings)
+        
+        os.makedirs(os.path.dirname(_KNOWLEDGE_INDEX), exist_ok=True)
+        faiss.write_index(index, _KNOWLEDGE_INDEX)
+        with open(_KNOWLEDGE_META, 'w', encoding='utf-8') as f:
+            json.dump({'embedding_model': _KNOWLEDGE_EMBED_MODEL, 'documents': list(documents)}, f, ensure_ascii=False)
+        
+        self.vectorstore = index
+        self.bitcoin_knowledge_base = list(documents)
+        self._knowledge_shingles = [_shingles(doc) for doc in documents]
+        print(f"💾 Milo saved knowledge index: {_KNOWLEDGE_INDEX} ({index.ntotal} vectors)")
         
     def retrieve_bitcoin_context(self, query: str, metrics: BitcoinMetrics) -> str:
         """Retrieve Bitcoin related context"""
         print(f"🔍 Milo is searching Bitcoin knowledge for: {query}")
         
         # Build context based on current data
-        context = f"""
-Current Bitcoin Data:
-- Price: ${metrics.price:,.2f}
-- Market Cap: ${metrics.market_cap:,.0f}
-- 24h Volume: ${metrics.volume_24h:,.0f}
-- Fear & Greed Index: {metrics.fear_greed_index}/100
-- Hash Rate: {metrics.hash_rate}
-- Daily Transactions: {metrics.transaction_count:,}
-
-Market Analysis Context:
-- Current market sentiment: {'Extreme Fear' if metrics.fear_greed_index < 25 else 'Fear' if metrics.fear_greed_index < 45 else 'Neutral' if metrics.fear_greed_index < 55 else 'Greed' if metrics.fear_greed_index < 75 else 'Extreme Greed'}
-- Network activity: {'High' if metrics.transaction_count > 300000 else 'Medium' if metrics.transaction_count > 200000 else 'Low'}
-"""
+        context = _render_context(metrics)
+        
+        relevant = self.search_knowledge(query)
+        if relevant:
+            context += "\nRelevant Knowledge:\n" + "".join(f"- {doc}\n" for doc in relevant)
         return context
-
-class MiloBitcoinLLM:
-    """Milo's Bitcoin-specific LLM system"""
     
-    def __init__(self):
-        self.model = None  # TODO: Load the fine-tuned Bitcoin-specific model
-        self.system_prompt = self._create_bitcoin_system_prompt()
+    def search_knowledge(self, query: str, top_k: int = 2) -> List[str]:
+        """Top knowledge entries for a query
+        
+        Uses the FAISS index (inner product of normalized embeddings) when one is
+        loaded; otherwise ranks entries by Jaccard similarity of word 1/2-shingles,
+        which needs no embedding model for the small built-in source list.
+        """
+        if self.vectorstore is not None and SentenceTransformer is not None:
+            _, ids = self.vectorstore.search(self._embed([query]), top_k)
+            return [self.bitcoin_knowledge_base[i] for i in ids[0] if i >= 0]
         
-    def _create_bitcoin_system_prompt(self) -> str:
-        """Create Bitcoin-specific system prompt"""
-        return """You are Milo 🐱₿, a knowledgeable and friendly Bitcoin analysis cat.
+        query_shingles = _shingles(query)
+        if not query_shingles:
+            return []
+        scored = []
+        for doc, doc_shingles in zip(self.bitcoin_knowledge_base, self._knowledge_shingles):
+            union = len(query_shingles | doc_shingles)
+            score = len(query_shingles & doc_shingles) / union if union else 0.0
+            if score > 0:
+                scored.append((score, doc))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [doc for _, doc in scored[:top_k]]
+
+# Bitcoin-specific system prompt
+_SYSTEM_PROMPT: Final[str] = """You are Milo 🐱₿, a knowledgeable and friendly Bitcoin analysis cat.
 
 Your expertise includes:
 - Bitcoin fundamentals and blockchain technology
@@ -341,28 +707,9 @@ IMPORTANT DISCLAIMERS:
 
 Remember: You're here to educate and inform, not to encourage reckless investment!
 """
-    
-    def analyze_bitcoin_query(self, user_query: str, context: str, metrics: BitcoinMetrics) -> str:
-        """Analyze user's Bitcoin-related questions"""
-        print("🧠 Milo is analyzing your Bitcoin question...")
-        
-        # TODO: Implement LLM inference
-        # Use fine-tuned model to combine real-time data and context
-        
-        # Temporary response logic
-        if "price" in user_query.lower():
-            return f"""🐱 Current Bitcoin price is ${metrics.price:,.2f}! 
 
-Based on the data I'm seeing:
-- Market sentiment is {'quite fearful' if metrics.fear_greed_index < 50 else 'optimistic'} (Fear & Greed: {metrics.fear_greed_index}/100)
-- Network activity shows {metrics.transaction_count:,} transactions today
-- 24h trading volume: ${metrics.volume_24h:,.0f}
-
-Remember: Past performance doesn't predict future results! 🐾
-*This is educational analysis, not financial advice. Always DYOR!*"""
-        
-        elif "should i buy" in user_query.lower() or "investment" in user_query.lower():
-            return """🐱 I can't give investment advice, but I can help you understand Bitcoin better! 
+# Canned reply that does not depend on live metrics
+_BUY_REPLY: Final[str] = """🐱 I can't give investment advice, but I can help you understand Bitcoin better! 
 
 Key things to consider:
 - Only invest what you can afford to lose completely
@@ -372,16 +719,63 @@ Key things to consider:
 
 Want me to explain any specific aspect of Bitcoin? 🐾
 *Always do your own research and consult financial advisors!*"""
-        
-        else:
-            return f"""🐱 That's an interesting Bitcoin question! 
+
+# Intent dispatch: lookaheads anchored at the start keep the original priority
+# (any "price" mention wins over buy/investment wording) in a single match call
+_INTENT_RE = re.compile(r"(?=.*?(?P<price>price))|(?=.*?(?P<buy>should i buy|investment))", re.I | re.S)
+
+# Reply templates compiled once; each call only fills in the varying values
+_fmt_price_reply = """🐱 Current Bitcoin price is ${price}! 
+
+Based on the data I'm seeing:
+- Market sentiment is {mood} (Fear & Greed: {fear_greed_index}/100)
+- Network activity shows {transaction_count} transactions today
+- 24h trading volume: ${volume_24h}
+
+Remember: Past performance doesn't predict future results! 🐾
+*This is educational analysis, not financial advice. Always DYOR!*""".format_map
+
+_fmt_default_reply = """🐱 That's an interesting Bitcoin question! 
 
 Based on current market data:
 {context}
 
 I'm still learning to provide more detailed analysis. What specific aspect of Bitcoin would you like to explore? 🐾
 
-*Educational purposes only - not financial advice!*"""
+*Educational purposes only - not financial advice!*""".format_map
+
+def _price_reply(context: str, metrics: BitcoinMetrics) -> str:
+    return _fmt_price_reply({
+        **metrics.formatted(),
+        'mood': 'quite fearful' if metrics.fear_greed_index < 50 else 'optimistic',
+    })
+
+def _buy_reply(context: str, metrics: BitcoinMetrics) -> str:
+    return _BUY_REPLY
+
+def _default_reply(context: str, metrics: BitcoinMetrics) -> str:
+    return _fmt_default_reply({'context': context})
+
+_INTENT_HANDLERS = {'price': _price_reply, 'buy': _buy_reply}
+
+class MiloBitcoinLLM:
+    """Milo's Bitcoin-specific LLM system"""
+    
+    def __init__(self):
+        self.model = None  # TODO: Load the fine-tuned Bitcoin-specific model
+        self.system_prompt = _SYSTEM_PROMPT
+        
+    def analyze_bitcoin_query(self, user_query: str, context: str, metrics: BitcoinMetrics) -> str:
+        """Analyze user's Bitcoin-related questions"""
+        print("🧠 Milo is analyzing your Bitcoin question...")
+        
+        # TODO: Implement LLM inference
+        # Use fine-tuned model to combine real-time data and context
+        
+        # Temporary response logic
+        m = _INTENT_RE.match(user_query)
+        handler = _INTENT_HANDLERS[m.lastgroup] if m else _default_reply
+        return handler(context, metrics)
 
 class MiloBitcoinAssistant:
     """Milo Bitcoin Assistant Main Class"""
@@ -391,11 +785,30 @@ class MiloBitcoinAssistant:
         self.rag_system = BitcoinRAGSystem()
         self.llm = MiloBitcoinLLM()
         self.current_metrics = None
+        self._refresh_task: Optional[asyncio.Task] = None  # In-flight refresh shared by concurrent callers
+        self._summary_cache: Optional[tuple] = None  # (metrics, formatted summary)
         print("🐱₿ Milo Bitcoin Assistant initialized! Ready to talk Bitcoin!")
         
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.data_collector.aclose()
+        
     async def refresh_data(self):
-        """Refresh Bitcoin data"""
+        """Refresh Bitcoin data (concurrent callers share one in-flight refresh)"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return await self._refresh_task
+        
         print("🔄 Milo is refreshing Bitcoin data...")
+        self._refresh_task = asyncio.create_task(self._do_refresh())
+        try:
+            return await self._refresh_task
+        finally:
+            if self._refresh_task is not None and self._refresh_task.done():
+                self._refresh_task = None
+    
+    async def _do_refresh(self):
         self.current_metrics = await self.data_collector.collect_comprehensive_data()
         
     async def chat(self, user_question: str) -> str:
@@ -421,47 +834,47 @@ class MiloBitcoinAssistant:
         if not self.current_metrics:
             await self.refresh_data()
         
-        summary = f"""🐱₿ Milo's Bitcoin Market Summary
-
-💰 Price: ${self.current_metrics.price:,.2f}
-📊 Market Cap: ${self.current_metrics.market_cap:,.0f}
-📈 24h Volume: ${self.current_metrics.volume_24h:,.0f}
-😰 Fear & Greed: {self.current_metrics.fear_greed_index}/100
-⛓️ Hash Rate: {self.current_metrics.hash_rate}
-💸 Network Fees: ${self.current_metrics.fees_usd:.2f}
-
-*Updated: {datetime.now().strftime('%Y-%m-%d %H:%M')} UTC*
-*For educational purposes only! 🐾*"""
+        # Metrics are frozen, so an unchanged object means an unchanged summary
+        if self._summary_cache is not None and self._summary_cache[0] is self.current_metrics:
+            return self._summary_cache[1]
         
+        summary = _SUMMARY_TEMPLATE.format_map({
+            **self.current_metrics.formatted(),
+            'updated': datetime.now().strftime('%Y-%m-%d %H:%M'),
+        })
+        
+        # Keep a reference (not just id()) so a recycled id can't hit a stale entry
+        self._summary_cache = (self.current_metrics, summary)
         return summary
 
 async def main():
     """Main Function - Milo Bitcoin Demo"""
+    # Per-fetch status is logged at DEBUG; set MILO_LOG_LEVEL=DEBUG to see it
+    logging.basicConfig(level=os.getenv("MILO_LOG_LEVEL", "INFO").upper(), format="%(message)s")
     print("🚀 Milo Bitcoin is starting...")
     print("🐱₿" + "=" * 50)
     
-    milo = MiloBitcoinAssistant()
-    
-    # Load the knowledge database
-    milo.rag_system.load_bitcoin_knowledge()
-    
-    # Demo functionality
-    print("\n📊 Demo: Bitcoin Market Summary")
-    summary = await milo.get_market_summary()
-    print(summary)
-    
-    print("\n💬 Demo: Chat with Milo about Bitcoin")
-    questions = [
-        "What's the current Bitcoin price?",
-        "Should I buy Bitcoin now?",
-        "Explain Bitcoin halving to me"
-    ]
-    
-    for question in questions:
-        print(f"\n🙋 Question: {question}")
-        response = await milo.chat(question)
-        print(f"🐱 Milo: {response}")
-        print("-" * 50)
+    async with MiloBitcoinAssistant() as milo:
+        # Load the knowledge database
+        milo.rag_system.load_bitcoin_knowledge()
+        
+        # Demo functionality
+        print("\n📊 Demo: Bitcoin Market Summary")
+        summary = await milo.get_market_summary()
+        print(summary)
+        
+        print("\n💬 Demo: Chat with Milo about Bitcoin")
+        questions = [
+            "What's the current Bitcoin price?",
+            "Should I buy Bitcoin now?",
+            "Explain Bitcoin halving to me"
+        ]
+        
+        for question in questions:
+            print(f"\n🙋 Question: {question}")
+            response = await milo.chat(question)
+            print(f"🐱 Milo: {response}")
+            print("-" * 50)
     
     print("\n✅ Demo completed! Milo is ready for Bitcoin analysis...")
     print("🐾 *purrs while thinking about blockchain*")
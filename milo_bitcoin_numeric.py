@@ -0,0 +1,51 @@
+# Milo_Bitcoin 🐱₿ - numeric helpers
+# Batch sentiment / network-activity classification for historical snapshots
+# and multi-asset scoring. Uses Numba when installed, NumPy otherwise.
+#
+# The bucket bounds are passed in by the caller (milo_bitcoin_main owns them),
+# so the thresholds live in one place.
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _classify_batch(fg, tx, fg_bounds, tx_bounds):
+        n = fg.shape[0]
+        out = np.empty((n, 2), dtype=np.int8)
+        for i in prange(n):
+            # Same buckets as bisect_right(fg_bounds, f) / bisect_left(tx_bounds, t)
+            f = fg[i]
+            k = 0
+            while k < fg_bounds.shape[0] and f >= fg_bounds[k]:
+                k += 1
+            out[i, 0] = k
+            t = tx[i]
+            k = 0
+            while k < tx_bounds.shape[0] and t > tx_bounds[k]:
+                k += 1
+            out[i, 1] = k
+        return out
+else:
+    def _classify_batch(fg, tx, fg_bounds, tx_bounds):
+        out = np.empty((fg.shape[0], 2), dtype=np.int8)
+        out[:, 0] = np.searchsorted(fg_bounds, fg, side='right')
+        out[:, 1] = np.searchsorted(tx_bounds, tx, side='left')
+        return out
+
+def classify_batch(fear_greed_index, transaction_count, fg_bounds, tx_bounds) -> np.ndarray:
+    """Bucket indices for many snapshots: column 0 indexes the fear & greed labels, column 1 the activity labels"""
+    fg = np.ascontiguousarray(fear_greed_index, dtype=np.int32)
+    tx = np.ascontiguousarray(transaction_count, dtype=np.int64)
+    if fg.shape != tx.shape or fg.ndim != 1:
+        raise ValueError("fear_greed_index and transaction_count must be 1-D arrays of equal length")
+    return _classify_batch(fg, tx, np.asarray(fg_bounds, dtype=np.int32), np.asarray(tx_bounds, dtype=np.int64))
+
+def label_batch(fear_greed_index, transaction_count, fg_bounds, fg_labels, tx_bounds, tx_labels):
+    """Sentiment and activity label arrays for many snapshots"""
+    idx = classify_batch(fear_greed_index, transaction_count, fg_bounds, tx_bounds)
+    return np.asarray(fg_labels)[idx[:, 0]], np.asarray(tx_labels)[idx[:, 1]]
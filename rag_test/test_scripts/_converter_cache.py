@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+测试脚本共享的DocumentConverter缓存
+每种转换器在进程内只初始化一次，避免各测试重复加载布局/VLM模型
+"""
+
+import functools
+import importlib.util
+import os
+import threading
+
+_lock = threading.Lock()
+
+
+def _vlm_pipeline_options():
+    """VLM管道选项：装有bitsandbytes时以int8加载权重，否则退回bf16"""
+    from docling.datamodel.pipeline_options import VlmPipelineOptions
+
+    pipeline_options = VlmPipelineOptions()
+    vlm_options = pipeline_options.vlm_options
+    fields = type(vlm_options).model_fields
+
+    if importlib.util.find_spec("bitsandbytes") is not None and "load_in_8bit" in fields:
+        update = {"quantized": True, "load_in_8bit": True}
+    elif "torch_dtype" in fields:
+        update = {"torch_dtype": "bfloat16"}
+    else:
+        # API变体（如MLX）不支持这些字段，保持默认
+        return pipeline_options
+
+    pipeline_options.vlm_options = vlm_options.model_copy(update=update)
+    return pipeline_options
+
+
+@functools.lru_cache(maxsize=None)
+def _build_converter(kind):
+    from docling.datamodel.base_models import InputFormat
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    if kind == "standard":
+        from docling.datamodel.pipeline_options import (
+            AcceleratorDevice,
+            AcceleratorOptions,
+            PdfPipelineOptions,
+        )
+
+        # 布局模型自动使用CUDA或MPS，CPU线程数放开到全部核心；测试PDF为数字原生，关闭OCR
+        pipeline_options = PdfPipelineOptions(
+            do_ocr=False,
+            do_table_structure=True,
+            accelerator_options=AcceleratorOptions(
+                num_threads=os.cpu_count() or 4,
+                device=AcceleratorDevice.AUTO,
+            )
+        )
+        return DocumentConverter(
+            format_options={
+                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options),
+            }
+        )
+    if kind == "vlm":
+        from docling.datamodel.settings import settings
+        from docling.pipeline.vlm_pipeline import VlmPipeline
+
+        # docling不提供逐页调用接口；增大每批送入VLM的页数，让GPU持续有活干
+        settings.perf.page_batch_size = max(
+            settings.perf.page_batch_size,
+            int(os.environ.get("DOCLING_PAGE_BATCH_SIZE", 8)),
+        )
+
+        converter = DocumentConverter(
+            format_options={
+                InputFormat.PDF: PdfFormatOption(
+                    pipeline_cls=VlmPipeline,
+                    pipeline_options=_vlm_pipeline_options(),
+                ),
+            }
+        )
+        # 立即加载VLM权重，而不是推迟到第一次convert
+        converter.initialize_pipeline(InputFormat.PDF)
+        return converter
+    raise ValueError(f"Unknown converter kind: {kind}")
+
+
+def _get_converter(kind="standard"):
+    """获取缓存的转换器: kind="standard" 为标准管道, kind="vlm" 为Granite VLM管道"""
+    # lru_cache本身不阻止并发的重复初始化，加锁保证模型只加载一次
+    with _lock:
+        return _build_converter(kind)
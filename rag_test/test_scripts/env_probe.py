@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+测试脚本共享的环境探测
+PyTorch/CUDA/Docling信息在进程内只采集一次，CUDA驱动只初始化一次
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class EnvInfo:
+    torch_version: str
+    cuda_ok: bool
+    device_name: Optional[str]
+    cuda_version: Optional[str]
+    docling_version: Optional[str]
+
+
+@lru_cache(maxsize=1)
+def probe():
+    """采集环境信息；torch或docling缺失时抛出ImportError"""
+    import torch
+
+    cuda_ok = torch.cuda.is_available()
+    device_name = torch.cuda.get_device_name(0) if cuda_ok else None
+
+    import docling
+    docling_version = getattr(docling, '__version__', None)
+
+    return EnvInfo(
+        torch_version=torch.__version__,
+        cuda_ok=cuda_ok,
+        device_name=device_name,
+        cuda_version=torch.version.cuda if cuda_ok else None,
+        docling_version=docling_version,
+    )
@@ -9,9 +9,16 @@ import os
 import sys
 import time
 import argparse
+import logging
 from datetime import datetime
 from pathlib import Path
 
+log = logging.getLogger(__name__)
+
+# 本次运行的统一时间戳，同一次运行的输出文件名保持一致
+RUN_TS = datetime.now()
+TS_STR = RUN_TS.strftime("%Y%m%d_%H%M%S")
+
 
 def process_pdf_standard(pdf_path):
     """使用标准处理管道处理PDF文件"""
@@ -47,15 +54,15 @@ def process_pdf_standard(pdf_path):
 
         # 生成输出文件名
         input_filename = Path(pdf_path).stem
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = TS_STR
         output_dir = Path("../test_outputs/markdown_results")
         output_dir.mkdir(parents=True, exist_ok=True)
 
         output_file = output_dir / f"{input_filename}_standard_{timestamp}.md"
 
         # 保存结果
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        with open(output_file, 'wb', buffering=1 << 20) as f:
+            f.write(markdown_content.encode('utf-8'))
 
         print(f"   💾 Saved: {output_file}")
         print(f"   📊 Content length: {len(markdown_content)} characters")
@@ -84,9 +91,7 @@ def process_pdf_standard(pdf_path):
         }
 
     except Exception as e:
-        print(f"❌ Standard processing failed: {e}")
-        import traceback
-        print(f"   Traceback: {traceback.format_exc()}")
+        log.exception("❌ Standard processing failed: %s", e)
         return False, None
 
 
@@ -100,12 +105,13 @@ def main():
     parser.add_argument('--verbose', '-v', action='store_true', help='显示详细输出')
 
     args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
 
     # 打印工具信息
     print("🚀 Granite Docling - Standard PDF Processing Tool")
     print("=" * 55)
     print(f"📁 Input file: {args.pdf_file}")
-    print(f"⏰ Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"⏰ Start time: {RUN_TS.strftime('%Y-%m-%d %H:%M:%S')}")
 
     # 处理PDF文件
     success, result = process_pdf_standard(args.pdf_file)
@@ -5,35 +5,34 @@ Phase 1: Granite Docling Basic Functionality Verification
 """
 
 import sys
-import time
 import traceback
 from datetime import datetime
 
+from _converter_cache import _get_converter
+from env_probe import probe
+
+# 本次运行的统一时间戳，同一次运行的输出文件名保持一致
+RUN_TS = datetime.now()
+TS_STR_LONG = RUN_TS.strftime("%Y-%m-%d_%H-%M-%S")
+
 def test_imports():
     """测试基础导入和依赖"""
     print("🔍 Testing imports...")
 
     try:
-        # 基础导入测试
-        import torch
-        print(f"✅ PyTorch: {torch.__version__}")
+        # 基础导入测试（环境信息只采集一次）
+        info = probe()
+        print(f"✅ PyTorch: {info.torch_version}")
 
         # CUDA检查
-        cuda_available = torch.cuda.is_available()
-        print(f"✅ CUDA available: {cuda_available}")
-        if cuda_available:
-            print(f"   GPU device: {torch.cuda.get_device_name(0)}")
-            print(f"   CUDA version: {torch.version.cuda}")
+        print(f"✅ CUDA available: {info.cuda_ok}")
+        if info.cuda_ok:
+            print(f"   GPU device: {info.device_name}")
+            print(f"   CUDA version: {info.cuda_version}")
 
         # Docling导入测试
-        import docling
         print(f"✅ Docling imported successfully")
-
-        # 检查Docling版本
-        try:
-            print(f"   Docling version: {docling.__version__}")
-        except AttributeError:
-            print("   Docling version: Unknown")
+        print(f"   Docling version: {info.docling_version or 'Unknown'}")
 
         return True
 
@@ -81,7 +80,7 @@ def test_docling_converter():
         print("✅ DocumentConverter imported")
 
         # 初始化转换器
-        converter = DocumentConverter()
+        converter = _get_converter("standard")
         print("✅ DocumentConverter initialized")
 
         return True, converter
@@ -122,7 +121,7 @@ def test_gpu_memory():
 
 def generate_phase1_report():
     """生成Phase 1测试报告"""
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    timestamp = TS_STR_LONG
 
     print(f"\n📊 Phase 1 Basic Verification Report")
     print(f"=" * 50)
@@ -175,7 +174,7 @@ if __name__ == "__main__":
     success, model, converter = generate_phase1_report()
 
     # 保存测试结果
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    timestamp = TS_STR_LONG
     status = "SUCCESS" if success else "FAILED"
 
     # 简单的结果记录
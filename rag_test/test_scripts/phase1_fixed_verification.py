@@ -5,35 +5,33 @@ Phase 1: 修复版Granite Docling功能验证
 """
 
 import sys
-import time
-import traceback
 from datetime import datetime
 
+from _converter_cache import _get_converter
+from env_probe import probe
+
+# 本次运行的统一时间戳，同一次运行的输出文件名保持一致
+RUN_TS = datetime.now()
+TS_STR_LONG = RUN_TS.strftime("%Y-%m-%d_%H-%M-%S")
+
 def test_imports():
     """测试基础导入和依赖"""
     print("🔍 Testing imports...")
 
     try:
-        # 基础导入测试
-        import torch
-        print(f"✅ PyTorch: {torch.__version__}")
+        # 基础导入测试（环境信息只采集一次）
+        info = probe()
+        print(f"✅ PyTorch: {info.torch_version}")
 
         # CUDA检查
-        cuda_available = torch.cuda.is_available()
-        print(f"✅ CUDA available: {cuda_available}")
-        if cuda_available:
-            print(f"   GPU device: {torch.cuda.get_device_name(0)}")
-            print(f"   CUDA version: {torch.version.cuda}")
+        print(f"✅ CUDA available: {info.cuda_ok}")
+        if info.cuda_ok:
+            print(f"   GPU device: {info.device_name}")
+            print(f"   CUDA version: {info.cuda_version}")
 
         # Docling导入测试
-        import docling
         print(f"✅ Docling imported successfully")
-
-        # 检查Docling版本
-        try:
-            print(f"   Docling version: {docling.__version__}")
-        except AttributeError:
-            print("   Docling version: Unknown")
+        print(f"   Docling version: {info.docling_version or 'Unknown'}")
 
         return True
 
@@ -80,7 +78,7 @@ def test_document_converter():
         print("✅ DocumentConverter imported")
 
         # 使用默认设置初始化
-        converter = DocumentConverter()
+        converter = _get_converter("standard")
         print("✅ DocumentConverter initialized with default settings")
 
         # 检查converter的关键方法
@@ -106,18 +104,19 @@ def test_alternative_docling_usage():
     print("\n🔄 Testing alternative Docling usage...")
 
     try:
-        # 方法1: 使用docling命令行接口
-        import subprocess
-        result = subprocess.run(['docling', '--version'],
-                              capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
+        # 方法1: 使用docling命令行接口（只检查PATH和包元数据，不启动子进程）
+        import shutil
+        from importlib.metadata import PackageNotFoundError, version
+
+        if shutil.which('docling'):
             print("✅ Docling CLI available")
-            print(f"   CLI output: {result.stdout.strip()}")
+            try:
+                print(f"   CLI version: {version('docling')}")
+            except PackageNotFoundError:
+                print("   CLI version: Unknown")
         else:
-            print("❌ Docling CLI not working properly")
+            print("❌ Docling CLI not found in PATH")
 
-    except FileNotFoundError:
-        print("❌ Docling CLI not found in PATH")
     except Exception as e:
         print(f"❌ CLI test error: {e}")
 
@@ -141,10 +140,8 @@ def test_simple_conversion():
     print("\n📄 Testing simple document conversion...")
 
     try:
-        from docling.document_converter import DocumentConverter
-
-        # 初始化转换器
-        converter = DocumentConverter()
+        # 复用TEST 3已初始化的转换器
+        converter = _get_converter("standard")
         print("✅ Converter ready for testing")
 
         # 获取可用的输入源（不实际转换，只检查功能）
@@ -161,7 +158,7 @@ def test_simple_conversion():
 
 def generate_fixed_report():
     """生成修复版Phase 1测试报告"""
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    timestamp = TS_STR_LONG
 
     print(f"\n📊 Phase 1 Fixed Verification Report")
     print(f"=" * 50)
@@ -227,7 +224,7 @@ if __name__ == "__main__":
     success, converter = generate_fixed_report()
 
     # 保存测试结果
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    timestamp = TS_STR_LONG
     status = "SUCCESS" if success else "FAILED"
 
     # 保存结果到文件
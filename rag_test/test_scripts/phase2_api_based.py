@@ -4,22 +4,30 @@ Phase 2: Bitcoin白皮书API处理测试
 使用DocumentConverter API直接调用
 """
 
+import argparse
+import logging
 import os
-import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
 
+from _converter_cache import _get_converter
+
+log = logging.getLogger(__name__)
+
+# 本次运行的统一时间戳，同一次运行的输出文件名保持一致
+RUN_TS = datetime.now()
+TS_STR = RUN_TS.strftime("%Y%m%d_%H%M%S")
+TS_STR_LONG = RUN_TS.strftime("%Y-%m-%d_%H-%M-%S")
+
 def test_simple_default_granite():
     """测试简单默认Granite设置"""
     print("🔄 Testing simple default Granite VLM...")
 
     try:
-        from docling.datamodel import vlm_model_specs
-        from docling.datamodel.base_models import InputFormat
-        from docling.datamodel.pipeline_options import VlmPipelineOptions
-        from docling.document_converter import DocumentConverter, PdfFormatOption
-        from docling.pipeline.vlm_pipeline import VlmPipeline
+        from docling.datamodel.base_models import DocumentStream
 
         # PDF路径
         pdf_path = "../test_inputs/bitcoin.pdf"
@@ -29,21 +37,20 @@ def test_simple_default_granite():
 
         print(f"✅ Found Bitcoin PDF: {pdf_path}")
 
-        # 创建转换器 - 使用简单默认设置
+        # 创建转换器 - 模型加载与PDF读取互不依赖，并行进行
         print("   Initializing DocumentConverter with VLM pipeline...")
-        converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(
-                    pipeline_cls=VlmPipeline,
-                ),
-            }
-        )
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            f_conv = ex.submit(_get_converter, "vlm")
+            f_data = ex.submit(Path(pdf_path).read_bytes)
+            converter, data = f_conv.result(), f_data.result()
 
         print("   Starting conversion...")
         start_time = time.time()
 
         # 执行转换
-        result = converter.convert(source=pdf_path)
+        result = converter.convert(
+            source=DocumentStream(name=Path(pdf_path).name, stream=BytesIO(data))
+        )
         doc = result.document
 
         elapsed = time.time() - start_time
@@ -53,10 +60,10 @@ def test_simple_default_granite():
         markdown_content = doc.export_to_markdown()
 
         # 保存结果
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = TS_STR
         output_file = f"../test_outputs/markdown_results/bitcoin_api_granite_{timestamp}.md"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        with open(output_file, 'wb', buffering=1 << 20) as f:
+            f.write(markdown_content.encode('utf-8'))
 
         print(f"   💾 Saved: {output_file}")
         print(f"   📊 Length: {len(markdown_content)} characters")
@@ -74,9 +81,7 @@ def test_simple_default_granite():
         }
 
     except Exception as e:
-        print(f"❌ Simple Granite failed: {e}")
-        import traceback
-        print(f"   Traceback: {traceback.format_exc()}")
+        log.exception("❌ Simple Granite failed: %s", e)
         return False, None
 
 def test_standard_pipeline():
@@ -84,12 +89,10 @@ def test_standard_pipeline():
     print("\n🔄 Testing standard pipeline (fallback)...")
 
     try:
-        from docling.document_converter import DocumentConverter
-
         pdf_path = "../test_inputs/bitcoin.pdf"
 
         print("   Initializing standard DocumentConverter...")
-        converter = DocumentConverter()  # 默认设置
+        converter = _get_converter("standard")
 
         print("   Starting standard conversion...")
         start_time = time.time()
@@ -104,10 +107,10 @@ def test_standard_pipeline():
         markdown_content = doc.export_to_markdown()
 
         # 保存结果
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = TS_STR
         output_file = f"../test_outputs/markdown_results/bitcoin_api_standard_{timestamp}.md"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        with open(output_file, 'wb', buffering=1 << 20) as f:
+            f.write(markdown_content.encode('utf-8'))
 
         print(f"   💾 Saved: {output_file}")
         print(f"   📊 Length: {len(markdown_content)} characters")
@@ -125,9 +128,7 @@ def test_standard_pipeline():
         }
 
     except Exception as e:
-        print(f"❌ Standard pipeline failed: {e}")
-        import traceback
-        print(f"   Traceback: {traceback.format_exc()}")
+        log.exception("❌ Standard pipeline failed: %s", e)
         return False, None
 
 def test_html_export(doc_result):
@@ -178,9 +179,9 @@ def compare_results(granite_result, standard_result):
 
     return False
 
-def generate_api_report():
-    """生成API测试报告"""
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+def generate_api_report(compare=False):
+    """生成API测试报告；compare=True时同时运行标准管道并比较结果"""
+    timestamp = TS_STR_LONG
 
     print(f"\n📊 Phase 2 API-Based Processing Report")
     print(f"=" * 50)
@@ -193,28 +194,29 @@ def generate_api_report():
     os.makedirs("../test_outputs/markdown_results", exist_ok=True)
     os.makedirs("../test_outputs/docling_results", exist_ok=True)
 
-    # Test 1: 标准处理（作为后备）
-    print(f"\n{'='*15} TEST 1: STANDARD PIPELINE {'='*15}")
-    standard_success, standard_result = test_standard_pipeline()
-    results['standard'] = standard_success
-
-    # Test 2: Granite VLM处理
-    print(f"\n{'='*15} TEST 2: GRANITE VLM API {'='*15}")
+    # Test 1: Granite VLM处理
+    print(f"\n{'='*15} TEST 1: GRANITE VLM API {'='*15}")
     granite_success, granite_result = test_simple_default_granite()
     results['granite_vlm'] = granite_success
 
+    # Test 2: 标准处理（作为后备；Granite成功且未要求比较时跳过）
+    standard_success, standard_result = False, None
+    if compare or not granite_success:
+        print(f"\n{'='*15} TEST 2: STANDARD PIPELINE {'='*15}")
+        standard_success, standard_result = test_standard_pipeline()
+        results['standard'] = standard_success
+    else:
+        print(f"\n⏭️  Skipping standard pipeline (Granite succeeded, use --compare to run both)")
+
     # Test 3: HTML导出测试
     print(f"\n{'='*15} TEST 3: HTML EXPORT {'='*15}")
     html_success = test_html_export(granite_result if granite_success else standard_result)
     results['html_export'] = html_success
 
     # Test 4: 结果比较
-    if standard_success or granite_success:
+    if compare:
         print(f"\n{'='*15} TEST 4: RESULT COMPARISON {'='*15}")
-        comparison_success = compare_results(granite_result, standard_result)
-        results['comparison'] = comparison_success
-    else:
-        results['comparison'] = False
+        results['comparison'] = compare_results(granite_result, standard_result)
 
     # 总结报告
     print(f"\n{'='*20} SUMMARY {'='*20}")
@@ -236,7 +238,7 @@ def generate_api_report():
         # 推荐最佳方法
         if results['granite_vlm']:
             print("🏆 Recommendation: Use Granite VLM for best quality")
-        elif results['standard']:
+        elif results.get('standard'):
             print("🏆 Recommendation: Use standard pipeline for reliability")
 
     else:
@@ -267,8 +269,13 @@ def granite_only_test():
         return None
 
 if __name__ == "__main__":
-    # 检查命令行参数
-    if len(sys.argv) > 1 and sys.argv[1] == "--granite-only":
+    # 先解析参数，--help 在加载任何docling模块之前返回
+    parser = argparse.ArgumentParser(description="Phase 2: Bitcoin白皮书API处理测试")
+    parser.add_argument('--granite-only', action='store_true', help='只运行Granite VLM测试')
+    parser.add_argument('--compare', action='store_true', help='同时运行标准管道并与Granite结果比较')
+    args = parser.parse_args()
+
+    if args.granite_only:
         # 只运行Granite测试
         result = granite_only_test()
         if result:
@@ -281,10 +288,10 @@ if __name__ == "__main__":
         print("=" * 60)
         print("💡 Tip: Use --granite-only flag to run only Granite VLM test")
 
-        success, results = generate_api_report()
+        success, results = generate_api_report(compare=args.compare)
 
         # 保存报告
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        timestamp = TS_STR_LONG
         status = "SUCCESS" if success else "FAILED"
 
         try:
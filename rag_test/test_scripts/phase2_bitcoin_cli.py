@@ -6,8 +6,18 @@ Phase 2: Bitcoin白皮书CLI处理测试
 
 import subprocess
 import os
+import re
 import time
 from datetime import datetime
+from pathlib import Path
+
+# 本次运行的统一时间戳，同一次运行的输出文件名保持一致
+RUN_TS = datetime.now()
+TS_STR = RUN_TS.strftime("%Y%m%d_%H%M%S")
+TS_STR_LONG = RUN_TS.strftime("%Y-%m-%d_%H-%M-%S")
+
+KEY_TERMS = ('Bitcoin', 'Satoshi Nakamoto', 'blockchain', 'peer-to-peer')
+KEY_TERMS_RE = re.compile('|'.join(map(re.escape, KEY_TERMS)))
 
 def test_bitcoin_cli_processing():
     """使用CLI命令处理Bitcoin白皮书"""
@@ -20,60 +30,22 @@ def test_bitcoin_cli_processing():
 
     print(f"✅ Found Bitcoin PDF: {pdf_path}")
 
-    # 创建输出目录
-    os.makedirs("../test_outputs/docling_results", exist_ok=True)
-    os.makedirs("../test_outputs/markdown_results", exist_ok=True)
-
-    results = {}
+    # 创建输出目录（docling直接把各格式写入该目录）
+    output_dir = Path(f"../test_outputs/docling_results/bitcoin_cli_{TS_STR}")
+    output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Test 1: 标准Markdown输出
-    print("\n🔄 Test 1: Converting to Markdown with Granite...")
+    # 一次转换同时导出Markdown和带Layout的HTML，模型和PDF只加载/解析一次
+    print("\n🔄 Converting to Markdown + HTML (with layout) with Granite...")
+    error = None
     try:
         cmd = [
             "docling",
             "--to", "md",
-            "--pipeline", "vlm",
-            "--vlm-model", "granite_docling",
-            pdf_path
-        ]
-
-        start_time = time.time()
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        elapsed = time.time() - start_time
-
-        if result.returncode == 0:
-            print(f"✅ Markdown conversion successful ({elapsed:.1f}s)")
-
-            # 保存结果
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            md_file = f"../test_outputs/markdown_results/bitcoin_{timestamp}.md"
-            with open(md_file, 'w', encoding='utf-8') as f:
-                f.write(result.stdout)
-
-            print(f"   💾 Saved to: {md_file}")
-            print(f"   📊 Output length: {len(result.stdout)} characters")
-            results['markdown'] = {'success': True, 'length': len(result.stdout), 'file': md_file}
-        else:
-            print(f"❌ Markdown conversion failed")
-            print(f"   Error: {result.stderr}")
-            results['markdown'] = {'success': False, 'error': result.stderr}
-
-    except subprocess.TimeoutExpired:
-        print("❌ Markdown conversion timed out")
-        results['markdown'] = {'success': False, 'error': 'Timeout'}
-    except Exception as e:
-        print(f"❌ Markdown conversion error: {e}")
-        results['markdown'] = {'success': False, 'error': str(e)}
-
-    # Test 2: HTML + Layout可视化
-    print("\n🔄 Test 2: Converting to HTML with layout...")
-    try:
-        cmd = [
-            "docling",
             "--to", "html_split_page",
             "--show-layout",
             "--pipeline", "vlm",
             "--vlm-model", "granite_docling",
+            "--output", str(output_dir),
             pdf_path
         ]
 
@@ -82,69 +54,40 @@ def test_bitcoin_cli_processing():
         elapsed = time.time() - start_time
 
         if result.returncode == 0:
-            print(f"✅ HTML conversion successful ({elapsed:.1f}s)")
-
-            # 保存结果
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            html_file = f"../test_outputs/docling_results/bitcoin_{timestamp}.html"
-            with open(html_file, 'w', encoding='utf-8') as f:
-                f.write(result.stdout)
-
-            print(f"   💾 Saved to: {html_file}")
-            print(f"   📊 Output length: {len(result.stdout)} characters")
-            results['html_layout'] = {'success': True, 'length': len(result.stdout), 'file': html_file}
+            print(f"✅ Conversion successful ({elapsed:.1f}s)")
         else:
-            print(f"❌ HTML conversion failed")
+            print(f"❌ Conversion failed")
             print(f"   Error: {result.stderr}")
-            results['html_layout'] = {'success': False, 'error': result.stderr}
+            error = result.stderr
 
     except subprocess.TimeoutExpired:
-        print("❌ HTML conversion timed out")
-        results['html_layout'] = {'success': False, 'error': 'Timeout'}
+        print("❌ Conversion timed out")
+        error = 'Timeout'
     except Exception as e:
-        print(f"❌ HTML conversion error: {e}")
-        results['html_layout'] = {'success': False, 'error': str(e)}
-
-    # Test 3: 双格式输出 (HTML + MD)
-    print("\n🔄 Test 3: Converting to both HTML and Markdown...")
-    try:
-        cmd = [
-            "docling",
-            "--to", "html",
-            "--to", "md",
-            "--pipeline", "vlm",
-            "--vlm-model", "granite_docling",
-            pdf_path
-        ]
+        print(f"❌ Conversion error: {e}")
+        error = str(e)
 
-        start_time = time.time()
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        elapsed = time.time() - start_time
+    # 按扩展名读取各格式输出
+    stem = Path(pdf_path).stem
+    outputs = {
+        'markdown': output_dir / f"{stem}.md",
+        'html_layout': output_dir / f"{stem}.html",
+    }
 
-        if result.returncode == 0:
-            print(f"✅ Dual format conversion successful ({elapsed:.1f}s)")
-
-            # 保存结果
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            dual_file = f"../test_outputs/docling_results/bitcoin_dual_{timestamp}.txt"
-            with open(dual_file, 'w', encoding='utf-8') as f:
-                f.write("=== DUAL FORMAT OUTPUT ===\n")
-                f.write(result.stdout)
-
-            print(f"   💾 Saved to: {dual_file}")
-            print(f"   📊 Output length: {len(result.stdout)} characters")
-            results['dual_format'] = {'success': True, 'length': len(result.stdout), 'file': dual_file}
+    results = {}
+    for test_name, output_file in outputs.items():
+        if error is None and output_file.exists():
+            length = output_file.stat().st_size
+            print(f"   💾 {test_name}: {output_file} ({length} bytes)")
+            results[test_name] = {'success': True, 'length': length, 'file': str(output_file)}
         else:
-            print(f"❌ Dual format conversion failed")
-            print(f"   Error: {result.stderr}")
-            results['dual_format'] = {'success': False, 'error': result.stderr}
+            results[test_name] = {'success': False, 'error': error or f"{output_file.name} not produced"}
 
-    except subprocess.TimeoutExpired:
-        print("❌ Dual format conversion timed out")
-        results['dual_format'] = {'success': False, 'error': 'Timeout'}
-    except Exception as e:
-        print(f"❌ Dual format conversion error: {e}")
-        results['dual_format'] = {'success': False, 'error': str(e)}
+    # 双格式输出：同一次转换得到的HTML和Markdown
+    if all(r['success'] for r in results.values()):
+        results['dual_format'] = {'success': True, 'length': sum(r['length'] for r in results.values())}
+    else:
+        results['dual_format'] = {'success': False, 'error': error or 'Missing output format'}
 
     return results
 
@@ -163,9 +106,9 @@ def analyze_cli_results(results):
                     with open(result['file'], 'r', encoding='utf-8') as f:
                         content = f.read()
 
-                    # 检查关键内容
-                    key_terms = ['Bitcoin', 'Satoshi Nakamoto', 'blockchain', 'peer-to-peer']
-                    found_terms = [term for term in key_terms if term in content]
+                    # 检查关键内容（单次正则扫描）
+                    hits = {m.group() for m in KEY_TERMS_RE.finditer(content)}
+                    found_terms = [term for term in KEY_TERMS if term in hits]
 
                     print(f"   📊 Content length: {len(content)} chars")
                     print(f"   🔍 Key terms found: {found_terms}")
@@ -185,7 +128,7 @@ def analyze_cli_results(results):
 
 def generate_phase2_cli_report():
     """生成Phase 2 CLI测试报告"""
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    timestamp = TS_STR_LONG
 
     print(f"\n📊 Phase 2 Bitcoin CLI Processing Report")
     print(f"=" * 55)
@@ -203,14 +146,16 @@ def generate_phase2_cli_report():
     # 生成总结
     print(f"\n{'='*20} SUMMARY {'='*20}")
 
-    successful_tests = sum(1 for r in cli_results.values() if r['success'])
-    total_tests = len(cli_results)
-
-    print(f"Successful conversions: {successful_tests}/{total_tests}")
-
+    # 统计与逐项状态在同一次遍历中完成
+    successful_tests = 0
+    status_lines = []
     for test_name, result in cli_results.items():
+        successful_tests += result['success']
         status = "✅ PASS" if result['success'] else "❌ FAIL"
-        print(f"{test_name:15}: {status}")
+        status_lines.append(f"{test_name:15}: {status}")
+
+    print(f"Successful conversions: {successful_tests}/{len(cli_results)}")
+    print("\n".join(status_lines))
 
     # 质量评估
     if successful_tests > 0:
@@ -235,7 +180,7 @@ if __name__ == "__main__":
     success, results = generate_phase2_cli_report()
 
     # 保存报告
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    timestamp = TS_STR_LONG
     status = "SUCCESS" if success else "FAILED"
 
     report_file = f"../test_reports/phase2_bitcoin_cli_{timestamp}_{status}.txt"
@@ -244,7 +189,7 @@ if __name__ == "__main__":
             f.write(f"Phase 2 Bitcoin CLI Processing: {status}\n")
             f.write(f"Timestamp: {timestamp}\n")
             f.write(f"Method: Docling CLI + Granite VLM\n")
-            f.write(f"Results: {len([r for r in results.values() if r['success']])}/{len(results)} successful\n")
+            f.write(f"Results: {sum(r['success'] for r in results.values())}/{len(results)} successful\n")
         print(f"\n📝 Report saved to: {report_file}")
     except Exception as e:
         print(f"⚠️ Could not save report: {e}")
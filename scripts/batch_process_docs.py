@@ -6,7 +6,9 @@ Milo Bitcoin RAG - 单GPU顺序批量文档处理器
 功能特性:
 - 单GPU顺序处理，避免CUDA内存冲突
 - 自动发现rag_data目录下的PDF文档
-- 使用生产环境granite_docling.py处理管道
+- 进程内复用同一个DocumentConverter批量转换（模型只加载一次）
+- 可选 --isolate：每个PDF单独调用生产环境granite_docling.py子进程
+- 可选 --worker：常驻工作进程只加载一次模型，崩溃或超时自动重启
 - 智能输出管理和质量检查
 - 处理进度跟踪和错误处理
 
@@ -18,13 +20,21 @@ Milo Bitcoin RAG - 单GPU顺序批量文档处理器
     python scripts/batch_process_docs.py --scan-only               # 仅扫描文档
     python scripts/batch_process_docs.py --category authoritative  # 仅处理权威文档
     python scripts/batch_process_docs.py --force                   # 强制重新处理
+    python scripts/batch_process_docs.py --isolate                 # 每个PDF独立子进程处理
+    python scripts/batch_process_docs.py --worker --restart-every 20  # 常驻工作进程，每20个文档重启
 """
 
 import os
 import sys
 import argparse
+import hashlib
+import json
+import logging
 import subprocess
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional, Tuple
@@ -41,16 +51,33 @@ except ImportError as e:
     print("Please run from project root directory")
     sys.exit(1)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps_json(obj) -> bytes:
+    """序列化为缩进的UTF-8 JSON，装有orjson时使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
 
 class SingleGPUBatchProcessor:
     """单GPU顺序批量处理器"""
 
-    def __init__(self, rag_data_path: str = "rag_data"):
+    def __init__(self, rag_data_path: str = "rag_data", isolate: bool = False, workers: int = 4,
+                 worker: bool = False, restart_every: int = 0):
         """
         初始化处理器
 
         Args:
             rag_data_path: RAG数据目录路径
+            isolate: 是否每个PDF启动独立的granite_docling.py子进程
+            workers: 保存、质量检查等I/O任务的线程数
+            worker: 是否在常驻工作进程中转换（模型只加载一次，保留进程隔离）
+            restart_every: 常驻工作进程每处理N个文档重启一次，0表示不主动重启
         """
         self.rag_data_path = Path(rag_data_path)
         self.sources_path = self.rag_data_path / "rag_sources"
@@ -61,18 +88,46 @@ class SingleGPUBatchProcessor:
         self.metadata_dir = self.processed_path / "metadata"
         self.logs_dir = Path("logs") / "processing"
 
+        # 已确保存在的目录，同一目录只mkdir一次
+        self._dirs_ensured = set()
         for dir_path in [self.chunks_dir, self.metadata_dir, self.logs_dir]:
-            dir_path.mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(dir_path)
 
         # 初始化工具
         self.scanner = DocumentScanner(str(self.rag_data_path))
         self.quality_checker = QualityChecker()
+        self._quality_cache = {}
 
         # granite_docling脚本路径（生产环境版本）
         self.granite_script = Path("scripts/granite_docling.py")
         if not self.granite_script.exists():
             raise FileNotFoundError(f"Granite script not found: {self.granite_script}")
 
+        # 进程内模式共享的转换器，首次处理时才加载模型（--scan-only 不会触发）
+        self.isolate = isolate
+        self._converter = None
+
+        # 常驻工作进程模式，首个文档时才启动
+        self.use_worker = worker
+        self.restart_every = restart_every
+        self._worker = None
+
+        # chunks目录中已有的文件名，每批开始时扫描一次，代替逐个Path.exists()
+        self._existing_outputs = None
+
+        # 内容哈希清单：PDF内容与docling版本都未变时跳过重复的GPU转换
+        self.manifest_path = self.metadata_dir / "manifest.json"
+        self.manifest = self._load_manifest()
+        self.docling_version = self._get_docling_version()
+        self._manifest_lock = threading.Lock()
+
+        # GPU转换串行，其余I/O任务并发
+        self.workers = max(1, workers)
+        self._gpu_sem = threading.Semaphore(1)
+
+        # isolate模式子进程环境：不写__pycache__，输出不缓冲以便逐行读取
+        self._child_env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1', 'PYTHONUNBUFFERED': '1'}
+
         # 处理统计
         self.stats = {
             'total_found': 0,
@@ -86,22 +141,30 @@ class SingleGPUBatchProcessor:
         # 初始化日志
         self._setup_logging()
 
+    def _ensure_dir(self, dir_path: Path):
+        """创建目录（每个目录只在首次用到时调用一次mkdir）"""
+        key = str(dir_path)
+        if key not in self._dirs_ensured:
+            Path(dir_path).mkdir(parents=True, exist_ok=True)
+            self._dirs_ensured.add(key)
+
     def _setup_logging(self):
-        """设置日志文件"""
+        """设置日志文件，日志文件句柄在整个批次中保持打开"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.log_file = self.logs_dir / f"batch_processing_{timestamp}.log"
         print(f"📋 Log file: {self.log_file}")
 
+        formatter = logging.Formatter("[%(asctime)s] %(levelname)s: %(message)s", "%Y-%m-%d %H:%M:%S")
+        self.logger = logging.getLogger(f"batch.{id(self)}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        for handler in (logging.FileHandler(self.log_file, encoding='utf-8'), logging.StreamHandler(sys.stdout)):
+            handler.setFormatter(formatter)
+            self.logger.addHandler(handler)
+
     def _log(self, message: str, level: str = "INFO"):
         """记录日志"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {level}: {message}"
-
-        print(log_entry)
-
-        # 写入日志文件
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry + "\n")
+        self.logger.log(logging.getLevelName(level), message)
 
     def scan_documents(self, category: Optional[str] = None) -> List[DocumentInfo]:
         """
@@ -152,13 +215,13 @@ class SingleGPUBatchProcessor:
         self._log(f"Starting single-GPU sequential processing of {len(documents)} documents")
         results = []
 
-        for i, doc in enumerate(documents, 1):
+        processed = self._iter_processed(documents, force)
+        for i, (doc, success, quality_report, output_file) in enumerate(processed, 1):
             self._log(f"\n{'='*60}")
-            self._log(f"Processing document {i}/{len(documents)}: {doc.filename}")
+            self._log(f"Document {i}/{len(documents)}: {doc.filename}")
             self._log(f"{'='*60}")
 
             try:
-                success, quality_report, output_file = self._process_single_document(doc, force)
                 results.append((doc, success, quality_report))
 
                 if success:
@@ -174,48 +237,240 @@ class SingleGPUBatchProcessor:
                     self.stats['failed'] += 1
                     self._log(f"❌ Failed to process: {doc.filename}", "ERROR")
 
-                # GPU降温间隔（可选）
-                if i < len(documents):  # 不是最后一个文档
-                    self._log("⏸️  GPU cooling interval (2 seconds)...")
-                    time.sleep(2)
-
             except Exception as e:
                 self._log(f"Unexpected error processing {doc.filename}: {e}", "ERROR")
                 results.append((doc, False, None))
                 self.stats['failed'] += 1
 
+        self._save_manifest()
+
         self._log(f"\n🎉 Batch processing completed!")
         self._log(f"Processed: {self.stats['processed']}, Failed: {self.stats['failed']}")
 
         return results
 
-    def _process_single_document(self, doc: DocumentInfo, force: bool = False) -> Tuple[bool, Optional[QualityReport], Optional[str]]:
+    def _iter_processed(self, documents: List[DocumentInfo], force: bool = False):
+        """
+        逐个产出处理结果 (文档信息, 是否成功, 质量报告, 输出文件路径)，按完成顺序
+
+        GPU转换始终串行：进程内模式由主线程驱动convert_all，isolate模式由
+        _gpu_sem保护子进程调用；保存、质量检查和报告写入交给线程池，
+        与下一个文档的GPU转换重叠进行
+        """
+        self._existing_outputs = self._scan_existing_outputs()
+
+        pending = []
+        for doc in documents:
+            cached_output = None if force else self._cached_output(doc)
+            if cached_output:
+                self._log(f"⏭️  Skipping {doc.filename} - already processed")
+                self.stats['skipped'] += 1
+                yield doc, True, None, cached_output
+            else:
+                pending.append(doc)
+
+        if not pending:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            if self.isolate:
+                futures = {
+                    pool.submit(self._process_single_document, doc): doc
+                    for doc in pending
+                }
+            elif self.use_worker:
+                futures = {
+                    pool.submit(self._process_in_worker, doc): doc
+                    for doc in pending
+                }
+            else:
+                futures = {
+                    pool.submit(self._finish_conversion, doc, conv_res, elapsed): doc
+                    for doc, conv_res, elapsed in self._convert_in_process(pending)
+                }
+
+            for future in as_completed(futures):
+                doc = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self._log(f"💥 Processing error for {doc.filename}: {e}", "ERROR")
+                    result = (False, None, None)
+                yield (doc, *result)
+
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+
+    def _convert_in_process(self, documents: List[DocumentInfo]):
+        """用共享的DocumentConverter.convert_all批量转换，模型只加载一次；产出 (文档信息, 转换结果, 耗时)"""
+        from scripts.granite_docling import build_converter, configure_page_batching
+
+        if self._converter is None:
+            self._log("🔧 Initializing DocumentConverter (shared by the whole batch)")
+            configure_page_batching()
+            self._converter = build_converter()
+
+        self._log(f"🔄 Converting {len(documents)} documents in-process")
+        start_time = time.time()
+
+        # convert_all按输入顺序产出结果，单个文件失败不会中断整个批次
+        conversions = self._converter.convert_all(
+            [doc.path for doc in documents], raises_on_error=False
+        )
+        for doc, conv_res in zip(documents, conversions):
+            yield doc, conv_res, time.time() - start_time
+            start_time = time.time()
+
+    def _finish_conversion(self, doc: DocumentInfo, conv_res, elapsed: float) -> Tuple[bool, Optional[QualityReport], Optional[str]]:
+        """保存转换结果并做质量检查（在线程池中运行）"""
+        from docling.datamodel.base_models import ConversionStatus
+        from scripts.granite_docling import save_document
+
+        if conv_res.status not in (ConversionStatus.SUCCESS, ConversionStatus.PARTIAL_SUCCESS):
+            self._log(f"❌ Granite processing failed for {doc.filename}: {conv_res.status}", "ERROR")
+            return False, None, None
+
+        self._log(f"✅ Granite processing completed in {elapsed:.1f}s")
+        result = save_document(doc.path, conv_res.document, elapsed, self.chunks_dir)
+        return self._check_quality(doc, result['output_file'])
+
+    def _check_quality(self, doc: DocumentInfo, output_file: str) -> Tuple[bool, QualityReport, str]:
+        """质量检查并保存报告"""
+        quality_report = self._cached_quality(output_file)
+        processed_at = datetime.now().isoformat()  # 质量报告与清单记录同一个处理时间
+        self._save_quality_report(quality_report, doc, processed_at)
+
+        self._log(f"📊 Quality score: {quality_report.total_score:.1f}/100")
+
+        self._record_manifest(doc, output_file, quality_report, processed_at)
+        return True, quality_report, output_file
+
+    def _cached_quality(self, output_file: str) -> QualityReport:
         """
-        处理单个PDF文档
+        按 (路径, 修改时间, 大小) 缓存质量检查结果，内容未变的输出不重复检查
+
+        优先读取granite_docling写在输出旁的 .stats.json，缺失或过期时才重新读取Markdown
+        """
+        stat = os.stat(output_file)
+        key = (str(output_file), stat.st_mtime_ns, stat.st_size)
+        report = self._quality_cache.get(key)
+        if report is None:
+            report = (self.quality_checker.check_from_stats(output_file)
+                      or self.quality_checker.check_document_quality(output_file))
+            self._quality_cache[key] = report
+        return report
+
+    def _load_manifest(self) -> dict:
+        """读取内容哈希清单 {PDF路径: {sha256, docling_version, size, mtime, output_file, ...}}"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self):
+        """写回内容哈希清单"""
+        with self._manifest_lock:
+            data = _dumps_json(self.manifest)
+        try:
+            with open(self.manifest_path, 'wb') as f:
+                f.write(data)
+        except OSError as e:
+            self._log(f"⚠️  Failed to save manifest: {e}", "WARNING")
+
+    @staticmethod
+    def _file_sha256(path: str) -> str:
+        """分块计算文件SHA-256"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _get_docling_version() -> str:
+        """docling版本号（不导入docling本身）"""
+        from importlib.metadata import PackageNotFoundError, version
+        try:
+            return version('docling')
+        except PackageNotFoundError:
+            return 'unknown'
+
+    def _scan_existing_outputs(self) -> set:
+        """一次os.scandir列出chunks目录下的已有文件名"""
+        try:
+            with os.scandir(self.chunks_dir) as it:
+                return {entry.name for entry in it if entry.is_file()}
+        except FileNotFoundError:
+            return set()
+
+    def _output_exists(self, path: Path) -> bool:
+        """chunks目录内的文件查已扫描的集合，其他位置回退到文件系统"""
+        if self._existing_outputs is not None and path.parent == self.chunks_dir:
+            return path.name in self._existing_outputs
+        return path.exists()
+
+    def _cached_output(self, doc: DocumentInfo) -> Optional[str]:
+        """
+        返回可复用的已处理输出路径，需要重新处理时返回None
+
+        有清单记录时按内容哈希和docling版本判断；没有记录的旧输出沿用文件是否存在的判断
+        """
+        entry = self.manifest.get(doc.path)
+        if entry is None:
+            expected_output = self._get_expected_output_path(doc)
+            return str(expected_output) if self._output_exists(expected_output) else None
+
+        output_file = Path(entry['output_file'])
+        if not self._output_exists(output_file) or entry.get('docling_version') != self.docling_version:
+            return None
+
+        # 大小和修改时间都没变时免去哈希计算
+        stat = os.stat(doc.path)
+        if stat.st_size == entry.get('size') and stat.st_mtime == entry.get('mtime'):
+            return str(output_file)
+        if self._file_sha256(doc.path) != entry.get('sha256'):
+            return None
+
+        with self._manifest_lock:
+            entry['mtime'] = stat.st_mtime
+        return str(output_file)
+
+    def _record_manifest(self, doc: DocumentInfo, output_file: str, report: QualityReport, processed_at: str):
+        """处理成功后登记内容哈希"""
+        stat = os.stat(doc.path)
+        entry = {
+            'sha256': self._file_sha256(doc.path),
+            'docling_version': self.docling_version,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'output_file': str(output_file),
+            'quality_score': report.total_score,
+            'processed_at': processed_at
+        }
+        with self._manifest_lock:
+            self.manifest[doc.path] = entry
+            if self._existing_outputs is not None:
+                self._existing_outputs.add(Path(output_file).name)
+
+    def _process_single_document(self, doc: DocumentInfo) -> Tuple[bool, Optional[QualityReport], Optional[str]]:
+        """
+        在独立子进程中处理单个PDF文档（是否跳过已由 _iter_processed 判断）
 
         Args:
             doc: 文档信息
-            force: 是否强制重新处理
 
         Returns:
             (是否成功, 质量报告, 输出文件路径)
         """
-        # 构建预期的输出文件路径
-        expected_output = self._get_expected_output_path(doc)
-
-        # 检查是否已处理
-        if not force and expected_output.exists():
-            self._log(f"⏭️  Skipping {doc.filename} - already processed")
-            self.stats['skipped'] += 1
-            return True, None, str(expected_output)
-
         # 使用生产环境 granite_docling.py 处理文档
         self._log(f"🔄 Calling production granite_docling.py for {doc.filename}")
 
         try:
             # 构建处理命令
             cmd = [
-                "python",
+                sys.executable,  # 与父进程同一解释器/虚拟环境，免去PATH查找
                 str(self.granite_script),
                 doc.path,
                 "--output-dir", str(self.chunks_dir)
@@ -223,64 +478,118 @@ class SingleGPUBatchProcessor:
 
             self._log(f"Command: {' '.join(cmd)}")
 
-            start_time = time.time()
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=600,  # 10分钟超时
-                cwd=str(Path.cwd())  # 确保在项目根目录运行
-            )
-
-            elapsed = time.time() - start_time
-
-            if result.returncode != 0:
-                self._log(f"❌ Granite processing failed: {result.stderr}", "ERROR")
+            # 同一时间只允许一个子进程占用GPU
+            with self._gpu_sem:
+                start_time = time.time()
+                returncode, output_file, timed_out, tail = self._run_granite_child(cmd)
+                elapsed = time.time() - start_time
+
+            if timed_out:
+                self._log(f"⏰ Processing timeout for {doc.filename}", "ERROR")
+                return False, None, None
+
+            if returncode != 0:
+                error_output = "\n".join(tail)
+                self._log(f"❌ Granite processing failed: {error_output}", "ERROR")
                 return False, None, None
 
             self._log(f"✅ Granite processing completed in {elapsed:.1f}s")
 
-            # 从输出中提取生成的文件路径
-            output_file = self._extract_output_file_from_result(result.stdout, doc)
+            # RESULT_FILE 行缺失时回退到预期位置
+            if not output_file:
+                expected = self._get_expected_output_path(doc)
+                if expected.exists():
+                    output_file = str(expected)
             if not output_file:
                 self._log(f"❌ Could not determine output file for {doc.filename}", "ERROR")
                 return False, None, None
 
             # 质量检查
-            quality_report = self.quality_checker.check_document_quality(output_file)
-            self._save_quality_report(quality_report, doc)
+            return self._check_quality(doc, output_file)
 
-            self._log(f"📊 Quality score: {quality_report.total_score:.1f}/100")
+        except Exception as e:
+            self._log(f"💥 Processing error for {doc.filename}: {e}", "ERROR")
+            return False, None, None
 
-            return True, quality_report, output_file
+    def _run_granite_child(self, cmd: List[str], timeout: int = 600) -> Tuple[int, Optional[str], bool, List[str]]:
+        """
+        运行granite_docling.py子进程，逐行读取输出并实时写入日志
 
-        except subprocess.TimeoutExpired:
-            self._log(f"⏰ Processing timeout for {doc.filename}", "ERROR")
-            return False, None, None
+        Returns:
+            (返回码, RESULT_FILE路径, 是否超时, 最后若干行输出)
+        """
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,  # 合并stderr，避免只读stdout时stderr管道写满阻塞
+            text=True,
+            bufsize=1,
+            cwd=str(Path.cwd()),  # 确保在项目根目录运行
+            env=self._child_env
+        )
+
+        # 10分钟超时：到时直接结束子进程，读循环随EOF退出
+        timed_out = threading.Event()
+        def _kill():
+            timed_out.set()
+            proc.kill()
+        killer = threading.Timer(timeout, _kill)
+        killer.start()
+
+        output_file = None
+        tail = deque(maxlen=20)
+        try:
+            for line in proc.stdout:
+                line = line.rstrip()
+                tail.append(line)
+                self._log(f"   │ {line}")
+                output_file = self._extract_output_file_from_result(line) or output_file
+            returncode = proc.wait()
+        finally:
+            killer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
+        return returncode, output_file, timed_out.is_set(), list(tail)
+
+    def _process_in_worker(self, doc: DocumentInfo) -> Tuple[bool, Optional[QualityReport], Optional[str]]:
+        """在常驻工作进程中处理单个PDF，工作进程崩溃时下一个文档会自动重启它"""
+        from scripts.granite_worker import GraniteWorker
+
+        try:
+            with self._gpu_sem:
+                if self._worker is None:
+                    self._log("🔧 Starting persistent Granite worker process")
+                    self._worker = GraniteWorker(restart_every=self.restart_every)
+                self._log(f"🔄 Sending {doc.filename} to Granite worker")
+                reply = self._worker.process(doc.path, str(self.chunks_dir))
         except Exception as e:
             self._log(f"💥 Processing error for {doc.filename}: {e}", "ERROR")
             return False, None, None
 
+        if not reply['ok']:
+            self._log(f"❌ Granite processing failed for {doc.filename}: {reply['error']}", "ERROR")
+            return False, None, None
+
+        self._log(f"✅ Granite processing completed in {reply['processing_time']:.1f}s")
+        return self._check_quality(doc, reply['output_file'])
+
     def _get_expected_output_path(self, doc: DocumentInfo) -> Path:
         """获取预期的输出文件路径"""
         input_filename = Path(doc.path).stem
         return self.chunks_dir / f"{input_filename}_processed.md"
 
-    def _extract_output_file_from_result(self, stdout: str, doc: DocumentInfo) -> Optional[str]:
-        """从granite_docling的输出中提取生成的文件路径"""
+    @staticmethod
+    def _extract_output_file_from_result(line: str) -> Optional[str]:
+        """从granite_docling的一行输出中提取生成的文件路径"""
         # 查找 "RESULT_FILE:" 行
-        for line in stdout.split('\n'):
-            if 'RESULT_FILE:' in line:
-                return line.split('RESULT_FILE:')[1].strip()
-
-        # 回退方案：检查预期位置
-        expected = self._get_expected_output_path(doc)
-        if expected.exists():
-            return str(expected)
-
+        if 'RESULT_FILE:' in line:
+            return line.split('RESULT_FILE:')[1].strip()
         return None
 
-    def _save_quality_report(self, report: QualityReport, doc: DocumentInfo):
+    def _save_quality_report(self, report: QualityReport, doc: DocumentInfo, processed_at: str):
         """保存质量报告到metadata目录"""
         try:
             # 构建元数据文件路径
@@ -288,10 +597,9 @@ class SingleGPUBatchProcessor:
             metadata_file = self.metadata_dir / relative_path.with_suffix('.json')
 
             # 确保目录存在
-            metadata_file.parent.mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(metadata_file.parent)
 
             # 保存报告
-            import json
             report_data = {
                 'file_path': report.file_path,
                 'total_score': report.total_score,
@@ -300,17 +608,26 @@ class SingleGPUBatchProcessor:
                 'issues': report.issues,
                 'strengths': report.strengths,
                 'metadata': report.metadata,
-                'processed_at': datetime.now().isoformat()
+                'processed_at': processed_at
             }
 
-            with open(metadata_file, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=2, ensure_ascii=False)
+            with open(metadata_file, 'wb') as f:
+                f.write(_dumps_json(report_data))
 
             self._log(f"💾 Saved quality report: {metadata_file.name}")
 
         except Exception as e:
             self._log(f"⚠️  Failed to save quality report for {doc.filename}: {e}", "WARNING")
 
+    def _gpu_mode_summary(self) -> str:
+        """摘要报告中的GPU处理模式说明"""
+        if self.isolate:
+            return "  • Automatic GPU memory cleanup per document (one subprocess each)"
+        if self.use_worker:
+            every = f"every {self.restart_every} documents" if self.restart_every else "only on crash/timeout"
+            return f"  • One persistent worker process (restarted {every})"
+        return "  • One in-process DocumentConverter shared by all documents"
+
     def generate_summary_report(self) -> str:
         """生成处理摘要报告"""
         return f"""
@@ -335,8 +652,7 @@ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 🎯 GPU Processing:
   • Sequential processing (no CUDA conflicts)
-  • Automatic GPU memory cleanup per document
-  • 2-second cooling intervals between documents
+{self._gpu_mode_summary()}
 
 ✅ Processing Complete!
 """
@@ -368,6 +684,33 @@ def main():
         help='强制重新处理所有文档（忽略已存在的文件）'
     )
 
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        '--isolate',
+        action='store_true',
+        help='每个PDF启动独立的granite_docling.py子进程（较慢，但单个文档崩溃不影响批次）'
+    )
+
+    mode.add_argument(
+        '--worker',
+        action='store_true',
+        help='在常驻工作进程中转换：模型只加载一次，崩溃或超时后自动重启'
+    )
+
+    parser.add_argument(
+        '--restart-every',
+        type=int,
+        default=0,
+        help='--worker模式下每处理N个文档重启工作进程，释放CUDA显存碎片（默认: 0，不主动重启）'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=4,
+        help='保存/质量检查等I/O任务的线程数（GPU转换始终串行，默认: 4）'
+    )
+
     parser.add_argument(
         '--rag-data',
         default='rag_data',
@@ -381,7 +724,13 @@ def main():
         print("="*60)
 
         # 初始化处理器
-        processor = SingleGPUBatchProcessor(args.rag_data)
+        processor = SingleGPUBatchProcessor(
+            args.rag_data,
+            isolate=args.isolate,
+            workers=args.workers,
+            worker=args.worker,
+            restart_every=args.restart_every
+        )
 
         # 扫描文档
         documents = processor.scan_documents(args.category)
@@ -409,18 +758,21 @@ def main():
         summary = processor.generate_summary_report()
         print(summary)
 
+        # 一次遍历同时收集失败和低质量文档
+        failed_docs, low_quality_docs = [], []
+        for doc, success, report in results:
+            if not success:
+                failed_docs.append(doc)
+            elif report and report.total_score < 60.0:
+                low_quality_docs.append((doc, report))
+
         # 显示失败的文档
-        failed_docs = [doc for doc, success, _ in results if not success]
         if failed_docs:
             print("❌ Failed Documents:")
             for doc in failed_docs:
                 print(f"  • {doc.filename}")
 
         # 显示低质量文档
-        low_quality_docs = [
-            (doc, report) for doc, success, report in results
-            if success and report and report.total_score < 60.0
-        ]
         if low_quality_docs:
             print("⚠️  Low Quality Documents (< 60.0):")
             for doc, report in low_quality_docs:
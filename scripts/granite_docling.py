@@ -5,28 +5,138 @@ Granite Docling Production: 生产环境标准文档处理工具
 适用于批量处理和RAG系统构建
 
 使用方法:
-    python scripts/granite_docling.py <pdf_file_path> [--output-dir <output_directory>]
+    python scripts/granite_docling.py <pdf_file_path> [<pdf_file_path> ...] [--glob <pattern>] [--output-dir <output_directory>] [--fast] [--ocr]
 
 示例:
     python scripts/granite_docling.py rag_data/rag_sources/authoritative/whitepaper/bitcoin.pdf
     python scripts/granite_docling.py file.pdf --output-dir rag_data/rag_sources/processed/chunks
+    python scripts/granite_docling.py a.pdf b.pdf
+    python scripts/granite_docling.py --glob "rag_data/rag_sources/authoritative/**/*.pdf"
 """
 
 import os
+import re
 import sys
 import time
 import argparse
+import logging
 from datetime import datetime
+from itertools import count
 from pathlib import Path
 
+# 以脚本方式运行时也能导入 scripts.utils
+sys.path.append(str(Path(__file__).parent.parent))
 
-def process_pdf_standard(pdf_path, output_dir=None):
+from scripts.utils.quality_checker import QualityChecker
+
+log = logging.getLogger(__name__)
+
+# 本次运行的开始时间
+RUN_TS = datetime.now()
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# 常见技术关键词
+KEY_TERMS = ('Bitcoin', 'blockchain', 'cryptocurrency', 'peer-to-peer', 'cryptographic',
+             'transaction', 'network', 'protocol', 'algorithm', 'hash', 'lightning',
+             'payment', 'channel', 'node', 'consensus', 'mining', 'wallet', 'signature')
+
+_KEY_TERMS_LC = {term.lower(): term for term in KEY_TERMS}
+
+if ahocorasick is not None:
+    _KEY_TERM_AUTOMATON = ahocorasick.Automaton()
+    for _term_lc, _term in _KEY_TERMS_LC.items():
+        _KEY_TERM_AUTOMATON.add_word(_term_lc, _term)
+    _KEY_TERM_AUTOMATON.make_automaton()
+else:
+    # 没有pyahocorasick时用单个编译好的正则一次扫描，长词优先
+    _KEY_TERMS_RE = re.compile(
+        '|'.join(re.escape(t) for t in sorted(_KEY_TERMS_LC, key=len, reverse=True)),
+        re.IGNORECASE,
+    )
+
+_HEADER_RE = re.compile(r'^#', re.MULTILINE)
+
+
+def find_key_terms(text):
+    """返回文本中出现的关键词（不区分大小写，按KEY_TERMS顺序）"""
+    if ahocorasick is None:
+        hits = {_KEY_TERMS_LC[m.group().lower()] for m in _KEY_TERMS_RE.finditer(text)}
+    else:
+        # Aho-Corasick单次扫描匹配全部关键词
+        hits = {term for _, term in _KEY_TERM_AUTOMATON.iter(text.lower())}
+    return [term for term in KEY_TERMS if term in hits]
+
+
+def build_converter(fast=False, ocr=False):
+    """
+    构建标准DocumentConverter，布局/OCR模型自动使用CUDA或MPS加速
+
+    Args:
+        fast: 使用pypdfium后端（更快、内存更省）；表格密集的文档建议保持默认docling-parse
+        ocr: 启用OCR；默认关闭，数字原生PDF无需OCR
+    """
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import (
+        AcceleratorDevice,
+        AcceleratorOptions,
+        PdfPipelineOptions,
+    )
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    # AUTO按 CUDA > MPS > CPU 选择设备；默认只用单线程，这里放开到全部核心
+    pipeline_options = PdfPipelineOptions(
+        do_ocr=ocr,
+        do_table_structure=True,
+        accelerator_options=AcceleratorOptions(
+            num_threads=os.cpu_count() or 4,
+            device=AcceleratorDevice.AUTO,
+        )
+    )
+    format_option = PdfFormatOption(pipeline_options=pipeline_options)
+    if fast:
+        from docling.backend.pypdfium2_backend import PyPdfiumDocumentBackend
+
+        format_option = PdfFormatOption(
+            backend=PyPdfiumDocumentBackend,
+            pipeline_options=pipeline_options,
+        )
+    return DocumentConverter(format_options={InputFormat.PDF: format_option})
+
+
+def configure_page_batching(page_batch_size=16, page_batch_concurrency=4):
+    """设置docling全局的页面批大小和批并发数，需在转换前调用"""
+    from docling.datamodel.settings import settings
+
+    settings.perf.page_batch_size = page_batch_size
+    settings.perf.page_batch_concurrency = page_batch_concurrency
+
+
+def _read_source(pdf_path):
+    """一次性顺序读入PDF，包装为docling的DocumentStream"""
+    from io import BytesIO
+
+    from docling.datamodel.base_models import DocumentStream
+
+    with open(pdf_path, 'rb') as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        data = f.read()
+    return DocumentStream(name=Path(pdf_path).name, stream=BytesIO(data))
+
+
+def process_pdf_standard(pdf_path, output_dir=None, fast=False, ocr=False):
     """
     使用标准处理管道处理PDF文件
 
     Args:
         pdf_path: PDF文件路径
         output_dir: 可选的输出目录，默认为 rag_data/rag_sources/processed/chunks
+        fast: 使用pypdfium快速后端
+        ocr: 启用OCR（扫描件需要）
 
     Returns:
         (成功标志, 结果字典)
@@ -34,10 +144,10 @@ def process_pdf_standard(pdf_path, output_dir=None):
     print(f"🔄 Processing with standard pipeline: {pdf_path}")
 
     try:
-        from docling.document_converter import DocumentConverter
-
-        # 检查文件是否存在
-        if not os.path.exists(pdf_path):
+        # 打开即检查存在性，读入内存后转换不再重复打开文件
+        try:
+            source = _read_source(pdf_path)
+        except FileNotFoundError:
             print(f"❌ PDF file not found: {pdf_path}")
             return False, None
 
@@ -45,78 +155,191 @@ def process_pdf_standard(pdf_path, output_dir=None):
 
         # 初始化标准DocumentConverter
         print("   Initializing DocumentConverter...")
-        converter = DocumentConverter()  # 使用默认标准设置
+        converter = build_converter(fast=fast, ocr=ocr)
 
         print("   Starting document conversion...")
         start_time = time.time()
 
         # 执行转换
-        result = converter.convert(source=pdf_path)
+        result = converter.convert(source=source)
         doc = result.document
 
         elapsed = time.time() - start_time
         print(f"✅ Conversion successful ({elapsed:.1f}s)")
 
-        # 导出到Markdown
-        print("   Exporting to Markdown...")
-        markdown_content = doc.export_to_markdown()
-
-        # 确定输出目录和文件名
-        if output_dir is None:
-            # 默认输出到RAG生产目录
-            output_dir = Path("rag_data/rag_sources/processed/chunks")
-        else:
-            output_dir = Path(output_dir)
-
-        output_dir.mkdir(parents=True, exist_ok=True)
-
-        # 生成输出文件名（保持简洁，适合生产环境）
-        input_filename = Path(pdf_path).stem
-        output_file = output_dir / f"{input_filename}_processed.md"
-
-        # 如果文件已存在，添加时间戳避免覆盖
-        if output_file.exists():
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = output_dir / f"{input_filename}_processed_{timestamp}.md"
-
-        # 保存结果
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
-
-        print(f"   💾 Saved: {output_file}")
-        print(f"   📊 Content length: {len(markdown_content)} characters")
-
-        # 分析内容质量
-        lines = markdown_content.split('\n')
-        headers = [line for line in lines if line.startswith('#')]
-
-        print(f"   📑 Total lines: {len(lines)}")
-        print(f"   🏷️  Headers found: {len(headers)}")
-
-        # 检查常见技术关键词
-        key_terms = ['Bitcoin', 'blockchain', 'cryptocurrency', 'peer-to-peer', 'cryptographic',
-                    'transaction', 'network', 'protocol', 'algorithm', 'hash', 'lightning',
-                    'payment', 'channel', 'node', 'consensus', 'mining', 'wallet', 'signature']
-        found_terms = [term for term in key_terms if term.lower() in markdown_content.lower()]
-        print(f"   🔍 Key terms found: {len(found_terms)}/{len(key_terms)} - {found_terms[:5]}")
-
-        return True, {
-            'content': markdown_content,
-            'output_file': str(output_file),
-            'processing_time': elapsed,
-            'content_length': len(markdown_content),
-            'lines_count': len(lines),
-            'headers_count': len(headers),
-            'key_terms': found_terms
-        }
+        return True, save_document(pdf_path, doc, elapsed, output_dir)
 
     except Exception as e:
-        print(f"❌ Standard processing failed: {e}")
-        import traceback
-        print(f"   Traceback: {traceback.format_exc()}")
+        log.exception("❌ Standard processing failed: %s", e)
         return False, None
 
 
+def process_pdfs_batch(pdf_paths, output_dir=None, fast=False, ocr=False):
+    """
+    批量处理多个PDF文件，共享同一个DocumentConverter（模型只加载一次）
+
+    Args:
+        pdf_paths: PDF文件路径列表
+        output_dir: 可选的输出目录，默认为 rag_data/rag_sources/processed/chunks
+        fast: 使用pypdfium快速后端
+        ocr: 启用OCR（扫描件需要）
+
+    Returns:
+        [(PDF路径, 成功标志, 结果字典), ...]
+    """
+    from docling.datamodel.base_models import ConversionStatus
+
+    print(f"🔄 Batch processing {len(pdf_paths)} files with standard pipeline")
+
+    results = []
+    missing = [p for p in pdf_paths if not os.path.exists(p)]
+    for pdf_path in missing:
+        print(f"❌ PDF file not found: {pdf_path}")
+        results.append((pdf_path, False, None))
+    pdf_paths = [p for p in pdf_paths if p not in missing]
+    if not pdf_paths:
+        return results
+
+    print("   Initializing DocumentConverter...")
+    converter = build_converter(fast=fast, ocr=ocr)
+
+    print("   Starting document conversion...")
+    start_time = time.time()
+
+    # convert_all逐个产出结果，单个文件失败不影响其余文件
+    for conv_res in converter.convert_all(pdf_paths, raises_on_error=False):
+        elapsed = time.time() - start_time
+        pdf_path = str(conv_res.input.file)
+
+        if conv_res.status in (ConversionStatus.SUCCESS, ConversionStatus.PARTIAL_SUCCESS):
+            print(f"\n✅ Conversion successful: {pdf_path} ({elapsed:.1f}s)")
+            try:
+                results.append((pdf_path, True, save_document(pdf_path, conv_res.document, elapsed, output_dir)))
+            except Exception as e:
+                log.exception("❌ Export failed for %s: %s", pdf_path, e)
+                results.append((pdf_path, False, None))
+        else:
+            print(f"\n❌ Conversion failed: {pdf_path} ({conv_res.status})")
+            results.append((pdf_path, False, None))
+
+        start_time = time.time()
+
+    return results
+
+
+_WRITE_CHUNK_CHARS = 1 << 20
+
+
+def _create_output_file(output_dir, stem):
+    """
+    独占创建输出文件（O_EXCL），返回 (路径, 文件描述符)
+
+    {stem}_processed.md 已存在时改用 _processed_{时间戳}.md，再冲突则追加序号；
+    同一进程在线程池中并发保存同名文档时，创建本身就是占位，不会互相覆盖
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL
+    try:
+        path = output_dir / f"{stem}_processed.md"
+        return path, os.open(path, flags, 0o644)
+    except FileExistsError:
+        pass
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    for n in count():
+        suffix = f"_{n}" if n else ""
+        path = output_dir / f"{stem}_processed_{timestamp}{suffix}.md"
+        try:
+            return path, os.open(path, flags, 0o644)
+        except FileExistsError:
+            continue
+
+
+def _write_text(fd, text):
+    """
+    按1M字符分段UTF-8编码后直接写文件描述符（写完关闭），绕过文本层和BufferedWriter
+
+    分段编码使同时存活的只有原字符串和一段字节，大文档不会多出一整份编码副本
+    """
+    try:
+        for start in range(0, len(text), _WRITE_CHUNK_CHARS):
+            view = memoryview(text[start:start + _WRITE_CHUNK_CHARS].encode('utf-8'))
+            while view:
+                view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def save_document(pdf_path, doc, elapsed, output_dir=None):
+    """导出Markdown、保存到输出目录并统计内容质量"""
+    # 导出到Markdown
+    print("   Exporting to Markdown...")
+    markdown_content = doc.export_to_markdown()
+
+    # 确定输出目录和文件名
+    if output_dir is None:
+        # 默认输出到RAG生产目录
+        output_dir = Path("rag_data/rag_sources/processed/chunks")
+    else:
+        output_dir = Path(output_dir)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # 生成输出文件名（保持简洁，适合生产环境；已存在时添加时间戳避免覆盖）
+    output_file, fd = _create_output_file(output_dir, Path(pdf_path).stem)
+
+    # 保存结果
+    _write_text(fd, markdown_content)
+
+    print(f"   💾 Saved: {output_file}")
+    print(f"   📊 Content length: {len(markdown_content)} characters")
+
+    # 分析内容质量
+    lines_count = markdown_content.count('\n') + 1
+    headers_count = sum(1 for _ in _HEADER_RE.finditer(markdown_content))
+
+    print(f"   📑 Total lines: {lines_count}")
+    print(f"   🏷️  Headers found: {headers_count}")
+
+    # 检查常见技术关键词
+    found_terms = find_key_terms(markdown_content)
+    print(f"   🔍 Key terms found: {len(found_terms)}/{len(KEY_TERMS)} - {found_terms[:5]}")
+
+    # Markdown还在内存中，顺便生成质量统计写到 .stats.json，批处理器不必再读回全文
+    checker = QualityChecker()
+    checker.write_stats(checker.check_content_quality(markdown_content, str(output_file)), output_file)
+
+    # 结果中不保留全文，批量处理时每个文档的Markdown写盘后即可释放
+    return {
+        'output_file': str(output_file),
+        'processing_time': elapsed,
+        'content_length': len(markdown_content),
+        'lines_count': lines_count,
+        'headers_count': headers_count,
+        'key_terms': found_terms
+    }
+
+
+def _report_batch(results):
+    """打印批量处理汇总，返回退出码"""
+    succeeded = [(path, result) for path, success, result in results if success]
+    failed = [path for path, success, _ in results if not success]
+
+    print("\n" + "=" * 60)
+    print(f"📦 Batch completed: {len(succeeded)}/{len(results)} files succeeded")
+    for path, result in succeeded:
+        print(f"   ✅ {path} -> {result['output_file']} ({result['processing_time']:.1f}s)")
+    for path in failed:
+        print(f"   ❌ {path}")
+
+    # 输出适合批量处理脚本解析的结果
+    if succeeded:
+        print()
+    for _, result in succeeded:
+        print(f"📤 RESULT_FILE: {result['output_file']}")
+
+    return 0 if not failed else 1
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(
@@ -125,11 +348,37 @@ def main():
         epilog=__doc__
     )
 
-    parser.add_argument('pdf_file', help='PDF文件路径')
+    parser.add_argument('pdf_files', nargs='*', metavar='pdf_file', help='PDF文件路径（可多个）')
+    parser.add_argument(
+        '--glob',
+        help='按通配符批量选取PDF，例如 "rag_data/rag_sources/**/*.pdf"'
+    )
     parser.add_argument(
         '--output-dir',
         help='输出目录（默认: rag_data/rag_sources/processed/chunks）'
     )
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help='使用pypdfium后端加速解析（表格密集文档建议使用默认后端）'
+    )
+    parser.add_argument(
+        '--ocr',
+        action='store_true',
+        help='启用OCR（默认关闭；扫描版PDF需要）'
+    )
+    parser.add_argument(
+        '--page-batch-size',
+        type=int,
+        default=16,
+        help='每批送入布局模型的页数（默认: 16）'
+    )
+    parser.add_argument(
+        '--page-batch-concurrency',
+        type=int,
+        default=4,
+        help='并发处理的页面批数（默认: 4）'
+    )
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -137,16 +386,32 @@ def main():
     )
 
     args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+
+    pdf_files = list(args.pdf_files)
+    if args.glob:
+        pdf_files.extend(str(p) for p in sorted(Path().glob(args.glob)))
+    if not pdf_files:
+        parser.error("请提供PDF文件路径或 --glob 通配符")
 
     # 打印工具信息
     print("🚀 Granite Docling Production - RAG Document Processor")
     print("=" * 60)
-    print(f"📁 Input file: {args.pdf_file}")
+    if len(pdf_files) == 1:
+        print(f"📁 Input file: {pdf_files[0]}")
+    else:
+        print(f"📁 Input files: {len(pdf_files)}")
     print(f"📂 Output dir: {args.output_dir or 'rag_data/rag_sources/processed/chunks'}")
-    print(f"⏰ Start time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"⚙️  Backend: {'pypdfium (fast)' if args.fast else 'docling-parse'}, OCR: {'on' if args.ocr else 'off'}")
+    print(f"⏰ Start time: {RUN_TS.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    configure_page_batching(args.page_batch_size, args.page_batch_concurrency)
+
+    if len(pdf_files) > 1:
+        return _report_batch(process_pdfs_batch(pdf_files, args.output_dir, fast=args.fast, ocr=args.ocr))
 
     # 处理PDF文件
-    success, result = process_pdf_standard(args.pdf_file, args.output_dir)
+    success, result = process_pdf_standard(pdf_files[0], args.output_dir, fast=args.fast, ocr=args.ocr)
 
     if success:
         print("\n" + "=" * 60)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Granite Docling 常驻工作进程
+子进程启动时加载一次模型，之后通过管道逐个接收PDF并返回输出文件路径；
+子进程崩溃（如CUDA OOM）或超时时自动重启，不影响父进程和后续文档
+
+由 batch_process_docs.py --worker 使用
+"""
+
+import multiprocessing
+import time
+
+
+def serve(conn, fast: bool = False, ocr: bool = False):
+    """工作进程主循环：收到 {'path', 'output_dir'} 处理并回复，收到None或管道关闭时退出"""
+    from docling.datamodel.base_models import ConversionStatus
+    from scripts.granite_docling import build_converter, configure_page_batching, save_document
+
+    configure_page_batching()
+    converter = build_converter(fast=fast, ocr=ocr)
+    conn.send({'ready': True})
+
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+
+        start_time = time.time()
+        try:
+            conv_res = converter.convert(msg['path'], raises_on_error=False)
+            if conv_res.status not in (ConversionStatus.SUCCESS, ConversionStatus.PARTIAL_SUCCESS):
+                conn.send({'ok': False, 'error': f"conversion status {conv_res.status}"})
+                continue
+            result = save_document(msg['path'], conv_res.document, time.time() - start_time, msg['output_dir'])
+            conn.send({'ok': True, 'output_file': result['output_file'], 'processing_time': result['processing_time']})
+        except Exception as e:
+            conn.send({'ok': False, 'error': repr(e)})
+
+
+class GraniteWorker:
+    """父进程侧的工作进程句柄，负责启动、按需重启和收发请求"""
+
+    def __init__(self, restart_every: int = 0, startup_timeout: int = 600, fast: bool = False, ocr: bool = False):
+        """
+        Args:
+            restart_every: 每处理N个文档重启一次以释放CUDA显存碎片，0表示不主动重启
+            startup_timeout: 等待模型加载完成的秒数
+            fast: 使用pypdfium后端
+            ocr: 启用OCR
+        """
+        self.restart_every = max(0, restart_every)
+        self.startup_timeout = startup_timeout
+        self.fast = fast
+        self.ocr = ocr
+
+        # CUDA不能在fork出的子进程中重新初始化，必须用spawn
+        self._ctx = multiprocessing.get_context('spawn')
+        self._proc = None
+        self._conn = None
+        self._handled = 0
+
+    def _start(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._proc = self._ctx.Process(
+            target=serve, args=(child_conn, self.fast, self.ocr), daemon=True
+        )
+        self._proc.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._handled = 0
+
+        if not self._conn.poll(self.startup_timeout):
+            self.stop()
+            raise RuntimeError(f"Granite worker did not start within {self.startup_timeout}s")
+        try:
+            self._conn.recv()
+        except EOFError:
+            self.stop()
+            raise RuntimeError("Granite worker exited during startup")
+
+    def stop(self):
+        """关闭工作进程（先请求正常退出，不响应则强制结束）"""
+        if self._proc is None:
+            return
+        try:
+            self._conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self._proc.join(timeout=10)
+        if self._proc.is_alive():
+            self._proc.kill()
+            self._proc.join()
+        self._conn.close()
+        self._proc = None
+        self._conn = None
+
+    def process(self, pdf_path: str, output_dir: str, timeout: int = 600) -> dict:
+        """
+        处理单个PDF
+
+        Returns:
+            {'ok': True, 'output_file', 'processing_time'} 或 {'ok': False, 'error'}
+        """
+        if self._proc is not None and self.restart_every and self._handled >= self.restart_every:
+            self.stop()
+        if self._proc is None or not self._proc.is_alive():
+            self.stop()
+            self._start()
+
+        self._handled += 1
+        self._conn.send({'path': pdf_path, 'output_dir': output_dir})
+
+        if not self._conn.poll(timeout):
+            # 超时：结束工作进程，下一个文档会重新启动
+            self._proc.kill()
+            self.stop()
+            return {'ok': False, 'error': f"timeout after {timeout}s"}
+        try:
+            return self._conn.recv()
+        except EOFError:
+            exitcode = self._proc.exitcode if self._proc else None
+            self.stop()
+            return {'ok': False, 'error': f"worker crashed (exit code {exitcode})"}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
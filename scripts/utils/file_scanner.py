@@ -5,12 +5,17 @@ Document Scanner - 文档发现和分类工具
 """
 
 import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DocumentInfo:
     """文档信息数据类"""
     path: str
@@ -35,14 +40,25 @@ class DocumentScanner:
         '.doc': 'Word'
     }
 
-    def __init__(self, rag_data_path: str):
+    # 扫描时不进入的目录（另外所有以.开头的隐藏目录也跳过）
+    _PRUNED_DIRS = frozenset({'__pycache__', 'node_modules', '.git', '.venv', '.mypy_cache', '.pytest_cache'})
+
+    def __init__(self, rag_data_path: str, max_workers: Optional[int] = None):
         """
         初始化文档扫描器
 
         Args:
             rag_data_path: rag_data目录路径
+            max_workers: 并发扫描子目录的线程数，默认 min(32, CPU数*4)（扫描以系统调用为主，不占CPU）
         """
         self.rag_data_path = Path(rag_data_path)
+        if max_workers is None:
+            max_workers = min(32, (os.cpu_count() or 1) * 4)
+        self.max_workers = max(1, max_workers)
+
+        # scan_all_documents 的短时缓存 (扫描时刻, 结果)，连续调用时共享一次遍历
+        self._cache: Optional[Tuple[float, List[DocumentInfo]]] = None
+        self._cache_ttl = 1.0
         self.sources_path = self.rag_data_path / "rag_sources"
 
         if not self.sources_path.exists():
@@ -53,19 +69,20 @@ class DocumentScanner:
         扫描所有支持的文档
 
         Returns:
-            文档信息列表
+            文档信息列表（_cache_ttl秒内的重复调用复用上次结果）
         """
-        documents = []
+        now = time.monotonic()
+        if self._cache is not None and now - self._cache[0] < self._cache_ttl:
+            return list(self._cache[1])
 
-        for root, dirs, files in os.walk(self.sources_path):
-            for file in files:
-                file_path = Path(root) / file
-                doc_info = self._analyze_document(file_path)
+        documents = sorted(self._scan_tree(self.sources_path), key=lambda x: (x.category, x.subcategory, x.filename))
+        self._cache = (now, documents)
 
-                if doc_info:
-                    documents.append(doc_info)
+        return list(documents)
 
-        return sorted(documents, key=lambda x: (x.category, x.subcategory, x.filename))
+    def invalidate_cache(self):
+        """丢弃缓存的扫描结果，下次调用重新遍历目录"""
+        self._cache = None
 
     def scan_by_category(self, category: str) -> List[DocumentInfo]:
         """
@@ -82,18 +99,11 @@ class DocumentScanner:
         if not category_path.exists():
             return []
 
-        documents = []
-        for root, dirs, files in os.walk(category_path):
-            for file in files:
-                file_path = Path(root) / file
-                doc_info = self._analyze_document(file_path)
-
-                if doc_info and doc_info.category == category:
-                    documents.append(doc_info)
+        documents = [doc for doc in self._scan_tree(category_path, (category,)) if doc.category == category]
 
         return sorted(documents, key=lambda x: (x.subcategory, x.filename))
 
-    def find_new_documents(self, processed_files: List[str]) -> List[DocumentInfo]:
+    def find_new_documents(self, processed_files: Iterable[str]) -> List[DocumentInfo]:
         """
         查找未处理的新文档
 
@@ -104,51 +114,117 @@ class DocumentScanner:
             新文档列表
         """
         all_docs = self.scan_all_documents()
-        processed_set = set(processed_files)
+        # 路径与DocumentInfo.path一样驻留，命中时直接按指针比较
+        processed_set = frozenset(map(sys.intern, processed_files))
 
         return [doc for doc in all_docs if doc.path not in processed_set]
 
-    def _analyze_document(self, file_path: Path) -> DocumentInfo:
+    def _scan_tree(self, root: Path, base_parts: Tuple[str, ...] = (), split_depth: int = 2) -> List[DocumentInfo]:
+        """
+        并发扫描目录树：前split_depth层在当前线程展开，其下每个子目录交给线程池递归扫描
+
+        Args:
+            root: 扫描根目录
+            base_parts: root相对sources_path的路径分段
+            split_depth: 展开到第几层子目录再分发（rag_sources下第2层即 类别/子类别）
+
+        Returns:
+            文档信息列表（未排序）
+        """
+        documents = []
+        frontier = [(str(root), base_parts)]
+        for _ in range(split_depth):
+            subdirs = []
+            for directory, parts in frontier:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        # 与os.walk一致：不进入符号链接目录
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self._is_pruned(entry.name):
+                                subdirs.append((entry.path, parts + (entry.name,)))
+                        elif entry.is_file():
+                            documents.append(self._analyze_document(entry, parts + (entry.name,)))
+            frontier = subdirs
+
+        # 每个任务同一时刻只持有一个scandir句柄，打开的文件描述符数不超过线程数
+        with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
+            subdir_docs = ex.map(lambda item: self._scan_subdir(*item), frontier)
+            return [doc for doc in chain(documents, chain.from_iterable(subdir_docs)) if doc]
+
+    def _scan_subdir(self, subdir: str, parts: Tuple[str, ...]) -> List[DocumentInfo]:
+        """递归扫描单个子目录（在线程池中运行，stat等I/O可并发）"""
+        documents = []
+        for entry, relative_parts in self._iter_entries(subdir, parts):
+            doc_info = self._analyze_document(entry, relative_parts)
+
+            if doc_info:
+                documents.append(doc_info)
+        return documents
+
+    def _iter_entries(self, root: str, parts: Tuple[str, ...]):
+        """
+        递归os.scandir，产出 (文件DirEntry, 相对sources_path的路径分段)
+
+        先关闭当前目录的scandir句柄再进入子目录，递归深度不会占用多个文件描述符
+        """
+        subdirs = []
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not self._is_pruned(entry.name):
+                        subdirs.append(entry)
+                elif entry.is_file():
+                    yield entry, parts + (entry.name,)
+
+        for entry in subdirs:
+            yield from self._iter_entries(entry.path, parts + (entry.name,))
+
+    @classmethod
+    def _is_pruned(cls, name: str) -> bool:
+        """隐藏目录、版本控制和缓存目录不会包含待处理文档，直接跳过"""
+        return name.startswith('.') or name in cls._PRUNED_DIRS
+
+    def _analyze_document(self, entry: os.DirEntry, relative_parts: Tuple[str, ...]) -> DocumentInfo:
         """
         分析单个文档信息
 
         Args:
-            file_path: 文件路径
+            entry: 文件的DirEntry（复用scandir已取得的名称和stat缓存）
+            relative_parts: 相对sources_path的路径分段，最后一段为文件名
 
         Returns:
             文档信息对象，如果不支持则返回None
         """
         try:
-            # 检查文件格式
-            suffix = file_path.suffix.lower()
+            # 检查文件格式（与Path.suffix一致：以点开头的隐藏文件没有后缀）
+            stem, dot, ext = entry.name.rpartition('.')
+            suffix = f".{ext.lower()}" if dot and stem else ''
             if suffix not in self.SUPPORTED_FORMATS:
                 return None
 
             # 分析文件路径结构
-            relative_path = file_path.relative_to(self.sources_path)
-            path_parts = relative_path.parts
-
-            if len(path_parts) < 2:
+            if len(relative_parts) < 2:
                 return None
 
-            category = path_parts[0]  # authoritative/supplementary
-            subcategory = path_parts[1] if len(path_parts) > 1 else "unknown"
+            category = relative_parts[0]  # authoritative/supplementary
+            subcategory = relative_parts[1] if len(relative_parts) > 1 else "unknown"
 
             # 获取文件信息
-            stat = file_path.stat()
+            stat = entry.stat()
 
             return DocumentInfo(
-                path=str(file_path),
-                filename=file_path.name,
-                format=self.SUPPORTED_FORMATS[suffix],
-                category=category,
-                subcategory=subcategory,
+                path=sys.intern(entry.path),
+                filename=entry.name,
+                # 类别/格式取值很少，驻留后各实例共享同一字符串，排序比较也更快
+                format=sys.intern(self.SUPPORTED_FORMATS[suffix]),
+                category=sys.intern(category),
+                subcategory=sys.intern(subcategory),
                 size=stat.st_size,
                 modified_time=stat.st_mtime
             )
 
         except Exception as e:
-            print(f"Warning: Failed to analyze {file_path}: {e}")
+            print(f"Warning: Failed to analyze {entry.path}: {e}")
             return None
 
     def get_statistics(self) -> Dict:
@@ -160,28 +236,18 @@ class DocumentScanner:
         """
         documents = self.scan_all_documents()
 
+        by_format = Counter(doc.format for doc in documents)
+        by_category = Counter(doc.category for doc in documents)
+        by_subcategory = Counter(f"{doc.category}/{doc.subcategory}" for doc in documents)
+
         stats = {
             "total_documents": len(documents),
-            "by_format": {},
-            "by_category": {},
-            "by_subcategory": {},
-            "total_size": 0
+            "by_format": dict(by_format),
+            "by_category": dict(by_category),
+            "by_subcategory": dict(by_subcategory),
+            "total_size": sum(doc.size for doc in documents)
         }
 
-        for doc in documents:
-            # 按格式统计
-            stats["by_format"][doc.format] = stats["by_format"].get(doc.format, 0) + 1
-
-            # 按类别统计
-            stats["by_category"][doc.category] = stats["by_category"].get(doc.category, 0) + 1
-
-            # 按子类别统计
-            key = f"{doc.category}/{doc.subcategory}"
-            stats["by_subcategory"][key] = stats["by_subcategory"].get(key, 0) + 1
-
-            # 总大小
-            stats["total_size"] += doc.size
-
         return stats
 
 
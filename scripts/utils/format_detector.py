@@ -4,11 +4,20 @@ Format Detector - 文档格式检测和处理策略选择
 根据文件格式选择最佳的处理策略
 """
 
+import codecs
 import mimetypes
+import os
+import shlex
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from enum import Enum
 
+try:
+    import magic
+except ImportError:
+    magic = None
+
 
 class ProcessingStrategy(Enum):
     """处理策略枚举"""
@@ -56,12 +65,15 @@ class FormatDetector:
     }
 
     @classmethod
-    def detect_format(cls, file_path: str) -> Tuple[str, ProcessingStrategy]:
+    def detect_format(cls, file_path: str, mtime: Optional[float] = None,
+                      size: Optional[int] = None) -> Tuple[str, ProcessingStrategy]:
         """
         检测文件格式并返回处理策略
 
         Args:
             file_path: 文件路径
+            mtime: 文件修改时间（调用方已有stat结果时传入，省去一次stat）
+            size: 文件大小（同上）
 
         Returns:
             (格式名称, 处理策略)
@@ -82,14 +94,26 @@ class FormatDetector:
             strategy = cls.FORMAT_STRATEGIES.get(format_name, ProcessingStrategy.UNSUPPORTED)
             return format_name, strategy
 
-        # 通过文件内容检测（简单启发式）
-        format_name = cls._detect_by_content(file_path)
+        # 通过文件内容检测（简单启发式），按 (路径, 修改时间, 大小) 缓存
+        if mtime is None or size is None:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                return "Unknown", ProcessingStrategy.UNSUPPORTED
+            mtime, size = stat.st_mtime, stat.st_size
+        format_name = cls._detect_by_content_cached(str(file_path), mtime, size)
         if format_name:
             strategy = cls.FORMAT_STRATEGIES.get(format_name, ProcessingStrategy.UNSUPPORTED)
             return format_name, strategy
 
         return "Unknown", ProcessingStrategy.UNSUPPORTED
 
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _detect_by_content_cached(file_path: str, mtime: float, size: int) -> Optional[str]:
+        """内容检测结果的缓存层；文件修改后 mtime/size 变化，旧条目自然失效"""
+        return FormatDetector._detect_by_content(file_path)
+
     @classmethod
     def _detect_by_content(cls, file_path: str) -> Optional[str]:
         """
@@ -105,18 +129,26 @@ class FormatDetector:
             with open(file_path, 'rb') as f:
                 header = f.read(1024)
 
-            # PDF文件检测
+            # PDF文件检测（最常见的情况，不必加载libmagic数据库）
             if header.startswith(b'%PDF-'):
                 return 'PDF'
 
+            # 装有python-magic时用libmagic嗅探；Markdown等纯文本会被识别为text/*，继续走下面的启发式
+            if magic is not None:
+                mime_type = magic.from_buffer(header, mime=True)
+                format_name = cls.MIME_FORMATS.get(mime_type)
+                if format_name and format_name != 'Text':
+                    return format_name
+                if not mime_type.startswith('text/'):
+                    return format_name
+
             # HTML文件检测
             if b'<html' in header.lower() or b'<!doctype html' in header.lower():
                 return 'HTML'
 
-            # 尝试作为文本文件读取
+            # 尝试把已读的文件头按UTF-8解码（增量解码器容忍末尾被截断的多字节字符）
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read(1000)
+                content = codecs.getincrementaldecoder('utf-8')().decode(header)[:1000]
 
                 # Markdown文件检测
                 if any(marker in content for marker in ['# ', '## ', '### ', '```', '**', '__']):
@@ -152,33 +184,36 @@ class FormatDetector:
         return strategy != ProcessingStrategy.UNSUPPORTED
 
     @classmethod
-    def get_processing_command(cls, file_path: str, output_dir: str) -> Optional[str]:
+    def get_processing_command(cls, file_path: str, output_dir: str,
+                               strategy: Optional[ProcessingStrategy] = None) -> Optional[List[str]]:
         """
         根据文件格式生成处理命令
 
         Args:
             file_path: 输入文件路径
             output_dir: 输出目录
+            strategy: 已检测出的处理策略，传入时不再重复读取文件检测格式
 
         Returns:
-            处理命令字符串，如果不支持则返回None
+            处理命令参数列表（可直接传给subprocess.run，需要字符串时用shlex.join），如果不支持则返回None
         """
-        format_name, strategy = cls.detect_format(file_path)
+        if strategy is None:
+            _, strategy = cls.detect_format(file_path)
 
         if strategy == ProcessingStrategy.GRANITE_DOCLING:
-            return f"uv run rag_test/test_scripts/granite_docling.py {file_path}"
+            return ['uv', 'run', 'rag_test/test_scripts/granite_docling.py', file_path]
 
         elif strategy == ProcessingStrategy.STANDARD_DOCLING:
             # 未来实现标准Docling处理
-            return f"docling --to md {file_path} --output {output_dir}"
+            return ['docling', '--to', 'md', file_path, '--output', output_dir]
 
         elif strategy == ProcessingStrategy.DIRECT_COPY:
             # Markdown文件直接复制
-            return f"cp {file_path} {output_dir}"
+            return ['cp', file_path, output_dir]
 
         elif strategy == ProcessingStrategy.SIMPLE_PARSE:
             # 简单文本处理
-            return f"python scripts/utils/text_processor.py {file_path} {output_dir}"
+            return ['python', 'scripts/utils/text_processor.py', file_path, output_dir]
 
         else:
             return None
@@ -216,12 +251,12 @@ if __name__ == "__main__":
     for file_path in test_files:
         if Path(file_path).exists():
             format_name, strategy = detector.detect_format(file_path)
-            command = detector.get_processing_command(file_path, "output/")
+            command = detector.get_processing_command(file_path, "output/", strategy)
 
             print(f"File: {Path(file_path).name}")
             print(f"  Format: {format_name}")
             print(f"  Strategy: {strategy.value}")
-            print(f"  Command: {command}")
+            print(f"  Command: {shlex.join(command) if command else None}")
             print()
 
     print("Supported Formats:", detector.get_format_info())
\ No newline at end of file
@@ -4,13 +4,62 @@ Quality Checker - 文档处理质量检查工具
 评估处理后文档的质量，检测潜在问题
 """
 
+import io
+import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple
-from dataclasses import dataclass
-
-
-@dataclass
+from typing import Dict, Iterable, List, Optional
+from dataclasses import asdict, dataclass
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+def _keyword_pattern(keywords):
+    """
+    把关键词表编译为单个正则，一次扫描统计全部关键词（与逐个子串查找结果一致）
+
+    零宽前瞻在每个位置取以该位置开头的最长关键词；同一位置开头的更短关键词
+    （如 block 之于 blockchain）通过credits一并计数。前瞻会命中同一关键词的重叠出现
+    （p2p2p 中的两个 p2p），计数时需按 str.count 的语义跳过（见 _count_keywords）
+
+    Returns:
+        (编译好的正则, {匹配到的关键词: 该位置出现的全部关键词})
+    """
+    ordered = sorted(keywords, key=len, reverse=True)
+    pattern = re.compile('(?=(' + '|'.join(map(re.escape, ordered)) + '))', re.IGNORECASE)
+    credits = {kw: [k for k in keywords if kw.startswith(k)] for kw in keywords}
+    return pattern, credits
+
+
+def _keyword_automaton(keyword_lists):
+    """
+    把多个关键词表装入一个Aho-Corasick自动机，一次扫描同时统计所有词表
+
+    Args:
+        keyword_lists: {词表名: 关键词列表}
+
+    Returns:
+        自动机（值为 [(词表名, 关键词), ...]）；未安装pyahocorasick时返回None
+    """
+    if ahocorasick is None:
+        return None
+    tags = {}
+    for kind, keywords in keyword_lists.items():
+        for kw in keywords:
+            tags.setdefault(kw, []).append((kind, kw))
+    automaton = ahocorasick.Automaton()
+    for kw, kinds in tags.items():
+        automaton.add_word(kw, kinds)
+    automaton.make_automaton()
+    return automaton
+
+
+@dataclass(slots=True)
 class QualityReport:
     """质量检查报告"""
     file_path: str
@@ -42,6 +91,27 @@ class QualityChecker:
         'htlc', 'commitment', 'revocation', 'onion', 'routing'
     ]
 
+    # 关键词全集，相关性比例按不重复关键词计算
+    BITCOIN_KEYWORDS_SET = frozenset(BITCOIN_KEYWORDS)
+    TECHNICAL_TERMS_SET = frozenset(TECHNICAL_TERMS)
+
+    _BITCOIN_RE, _BITCOIN_CREDITS = _keyword_pattern(BITCOIN_KEYWORDS)
+    _TECHNICAL_RE, _TECHNICAL_CREDITS = _keyword_pattern(TECHNICAL_TERMS)
+    _KEYWORD_AUTOMATON = _keyword_automaton({'bitcoin': BITCOIN_KEYWORDS, 'technical': TECHNICAL_TERMS})
+
+    # 逐行匹配用的正则（作用于带行尾换行符的单行）
+    _HEADER_LINE_RE = re.compile(r'#+\s')        # 元数据中的标题计数
+    _LIST_ITEM_RE = re.compile(r'\s*[-*+]\s')
+    # 格式问题只判断是否出现，search命中即停
+    _EXCESSIVE_REPEAT_RE = re.compile(r'(.)\1{10,}')
+    _WEIRD_NUMBERING_RE = re.compile(r'#+\s*\d+(\.\d+){5,}')
+    _NUMBERING_HEAD_RE = re.compile(r'#+\s*$')          # 编号在后面的行上
+    _NUMBERING_TAIL_RE = re.compile(r'\s*\d+(\.\d+){5,}')
+    _STAR_RUNS_RE = re.compile(r'\*+|[^*]+')
+
+    # 关键词和重复字符检查每次扫描的整行块大小（字符数）
+    _SCAN_CHUNK_CHARS = 1 << 16
+
     def __init__(self):
         """初始化质量检查器"""
         pass
@@ -50,6 +120,9 @@ class QualityChecker:
         """
         检查文档质量
 
+        按行流式读取文件，内存占用与文件大小无关；
+        非法UTF-8字节替换为U+FFFD后继续评分，不会因个别坏字节得到零分
+
         Args:
             file_path: 文档文件路径
 
@@ -57,87 +130,319 @@ class QualityChecker:
             质量报告
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # 基础统计
-            lines = content.split('\n')
-            line_count = len(lines)
-            content_length = len(content)
-
-            # 质量检查
-            issues = []
-            strengths = []
-            scores = {}
-
-            # 1. 内容长度检查
-            length_score = self._check_content_length(content_length, issues, strengths)
-            scores['length'] = length_score
-
-            # 2. 结构检查
-            structure_score = self._check_structure(content, issues, strengths)
-            scores['structure'] = structure_score
-
-            # 3. Bitcoin相关性检查
-            relevance_score = self._check_bitcoin_relevance(content, issues, strengths)
-            scores['relevance'] = relevance_score
-
-            # 4. 技术深度检查
-            technical_score = self._check_technical_depth(content, issues, strengths)
-            scores['technical'] = technical_score
-
-            # 5. 格式质量检查
-            format_score = self._check_format_quality(content, issues, strengths)
-            scores['format'] = format_score
-
-            # 6. 重复内容检查
-            duplication_score = self._check_duplication(content, issues, strengths)
-            scores['duplication'] = duplication_score
-
-            # 计算总分（加权平均）
-            weights = {
-                'length': 0.15,
-                'structure': 0.25,
-                'relevance': 0.20,
-                'technical': 0.15,
-                'format': 0.15,
-                'duplication': 0.10
-            }
-
-            total_score = sum(scores[key] * weights[key] for key in scores)
-
-            # 生成元数据
-            metadata = {
-                'scores': scores,
-                'weights': weights,
-                'bitcoin_keyword_count': self._count_keywords(content, self.BITCOIN_KEYWORDS),
-                'technical_term_count': self._count_keywords(content, self.TECHNICAL_TERMS),
-                'header_count': len(re.findall(r'^#+\s+', content, re.MULTILINE)),
-                'code_block_count': len(re.findall(r'```', content)),
-                'table_count': len(re.findall(r'^\|', content, re.MULTILINE)),
-                'word_count': len(content.split())
-            }
-
-            return QualityReport(
-                file_path=file_path,
-                total_score=round(total_score, 2),
-                content_length=content_length,
-                line_count=line_count,
-                issues=issues,
-                strengths=strengths,
-                metadata=metadata
-            )
+            with open(file_path, 'r', encoding='utf-8', errors='replace', buffering=1 << 20) as f:
+                line_stats = self._scan_lines(f)
+
+            return self._build_report(line_stats, file_path)
 
         except Exception as e:
-            return QualityReport(
-                file_path=file_path,
-                total_score=0.0,
-                content_length=0,
-                line_count=0,
-                issues=[f"Failed to process file: {str(e)}"],
-                strengths=[],
-                metadata={}
-            )
+            # 读取失败或评分出错（如空文档没有非空行）都记为零分报告
+            return self._failed_report(file_path, e)
+
+    def check_content_quality(self, content: str, file_path: str) -> QualityReport:
+        """
+        检查内存中文档内容的质量（不读文件）
+
+        Args:
+            content: Markdown内容
+            file_path: 报告中记录的文件路径
+
+        Returns:
+            质量报告
+        """
+        try:
+            return self._build_report(self._scan_lines(io.StringIO(content)), file_path)
+
+        except Exception as e:
+            return self._failed_report(file_path, e)
+
+    def check_many(self, paths: List[str], workers: Optional[int] = None) -> List[QualityReport]:
+        """
+        并行检查多个文档（评分为纯CPU计算，用进程池绕开GIL）
+
+        检查器没有可变状态，正则和关键词表都在类级别，每个工作进程导入时自行构建
+
+        Args:
+            paths: 文档文件路径列表
+            workers: 进程数，默认CPU核数
+
+        Returns:
+            与paths顺序一致的质量报告列表
+        """
+        paths = list(paths)
+        workers = max(1, min(workers or os.cpu_count() or 1, len(paths) or 1))
+        if workers == 1:
+            return [self.check_document_quality(path) for path in paths]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(paths) // (4 * workers))
+            return list(executor.map(self.check_document_quality, paths, chunksize=chunksize))
+
+    def _build_report(self, line_stats: Dict[str, object], file_path: str) -> QualityReport:
+        """根据逐行统计结果评分并生成质量报告"""
+        content_length = line_stats['content_length']
+        bitcoin_counts = line_stats['bitcoin_counts']
+        technical_counts = line_stats['technical_counts']
+
+        # 质量检查
+        issues = []
+        strengths = []
+        scores = {}
+
+        # 1. 内容长度检查
+        length_score = self._check_content_length(content_length, issues, strengths)
+        scores['length'] = length_score
+
+        # 2. 结构检查
+        structure_score = self._check_structure(line_stats, issues, strengths)
+        scores['structure'] = structure_score
+
+        # 3. Bitcoin相关性检查
+        relevance_score = self._check_bitcoin_relevance(bitcoin_counts, issues, strengths)
+        scores['relevance'] = relevance_score
+
+        # 4. 技术深度检查
+        technical_score = self._check_technical_depth(technical_counts, issues, strengths)
+        scores['technical'] = technical_score
+
+        # 5. 格式质量检查
+        format_score = self._check_format_quality(line_stats, issues, strengths)
+        scores['format'] = format_score
+
+        # 6. 重复内容检查
+        duplication_score = self._check_duplication(line_stats, issues, strengths)
+        scores['duplication'] = duplication_score
+
+        # 计算总分（加权平均）
+        weights = {
+            'length': 0.15,
+            'structure': 0.25,
+            'relevance': 0.20,
+            'technical': 0.15,
+            'format': 0.15,
+            'duplication': 0.10
+        }
+
+        total_score = sum(scores[key] * weights[key] for key in scores)
+
+        # 生成元数据
+        metadata = {
+            'scores': scores,
+            'weights': weights,
+            'bitcoin_keyword_count': sum(bitcoin_counts.values()),
+            'technical_term_count': sum(technical_counts.values()),
+            'header_count': line_stats['header_lines'],
+            'code_block_count': line_stats['code_fences'],
+            'table_count': line_stats['table_rows'],
+            'word_count': line_stats['word_count']
+        }
+
+        return QualityReport(
+            file_path=file_path,
+            total_score=round(total_score, 2),
+            content_length=content_length,
+            line_count=line_stats['line_count'],
+            issues=issues,
+            strengths=strengths,
+            metadata=metadata
+        )
+
+    @staticmethod
+    def _failed_report(file_path: str, error: Exception) -> QualityReport:
+        """处理失败时的零分报告"""
+        return QualityReport(
+            file_path=file_path,
+            total_score=0.0,
+            content_length=0,
+            line_count=0,
+            issues=[f"Failed to process file: {str(error)}"],
+            strengths=[],
+            metadata={}
+        )
+
+    def _scan_lines(self, lines: Iterable[str]) -> Dict[str, object]:
+        """
+        一次遍历全部行，收集评分需要的所有统计：长度、标题、列表、表格、代码块、
+        段落、词数、去重行、关键词次数和格式问题
+
+        lines为带行尾换行符的行迭代器（文件对象或StringIO），不需要整篇内容常驻内存；
+        关键词和重复字符按约64K字符的整行块扫描（两者都不跨行），
+        跨行的加粗和章节编号检查用少量状态在行间延续
+        """
+        stats = {
+            'content_length': 0,
+            'line_count': 1,
+            'header_lines': 0,
+            'titled_headers': 0,
+            'list_items': 0,
+            'table_rows': 0,
+            'code_fences': 0,
+            'paragraphs': 0,
+            'word_count': 0,
+            'nonblank_lines': 0,
+            'unique_lines': set(),
+            'bitcoin_counts': {},
+            'technical_counts': {},
+            'excessive_repeats': False,
+            'weird_numbering': False,
+            'bold': False,
+        }
+        in_paragraph = False
+        # 原正则 ^(#+)\s+(.+)$ 中的\s+贪婪跨行：标记后整行都是空白时，标题文字取后面第一个
+        # 非空白行（该行随之被这次匹配吃掉，不能再作为标题起点）；直到文末都是空白时回溯，
+        # 只要标记后第二个起的空白中有非换行字符（pending_blank）也算一次
+        pending_header = pending_blank = False
+        # 列表同理：^\s*[-*+]\s+ 的\s+会吃掉标记后的换行和下一非空行的行首空白，
+        # 该行即使是列表项也不再从行首匹配
+        list_tail = False
+        # 章节编号：行尾的 # 标记后，编号可能在后面的行上
+        pending_numbering = False
+        # 加粗：'*'连续段不跨行，非'*'段可以跨行；记录当前非'*'段之前的'*'段长度
+        star_before, in_text_run = 0, False
+
+        chunk, chunk_chars = [], 0
+
+        for line in lines:
+            stats['content_length'] += len(line)
+            chunk.append(line)
+            chunk_chars += len(line)
+            if chunk_chars >= self._SCAN_CHUNK_CHARS:
+                self._scan_chunk(''.join(chunk), stats)
+                chunk, chunk_chars = [], 0
+
+            stripped = line.strip()
+
+            if not stats['weird_numbering'] and (pending_numbering or '#' in line):
+                if pending_numbering and stripped:
+                    pending_numbering = False
+                    if self._NUMBERING_TAIL_RE.match(line):
+                        stats['weird_numbering'] = True
+                if '#' in line:
+                    if self._WEIRD_NUMBERING_RE.search(line):
+                        stats['weird_numbering'] = True
+                    elif self._NUMBERING_HEAD_RE.search(line):
+                        pending_numbering = True
+
+            if not stats['bold']:
+                if '*' in line:
+                    for run in self._STAR_RUNS_RE.findall(line):
+                        if run[0] == '*':
+                            if in_text_run and star_before >= 2 and len(run) >= 2:
+                                stats['bold'] = True
+                                break
+                            star_before, in_text_run = len(run), False
+                        else:
+                            in_text_run = True
+                else:
+                    in_text_run = True
+
+            consumed = False
+            if pending_header:
+                if stripped:
+                    stats['titled_headers'] += 1
+                    pending_header = pending_blank = False
+                    consumed = True
+                elif line.strip('\n'):
+                    pending_blank = True
+
+            list_blocked = False
+            if list_tail and stripped:
+                list_tail = False
+                list_blocked = line[0].isspace()
+
+            # 段落以空行分隔（仅含空白的行不算分隔）
+            if line == '\n':
+                in_paragraph = False
+            elif stripped:
+                if not in_paragraph:
+                    stats['paragraphs'] += 1
+                    in_paragraph = True
+                stats['nonblank_lines'] += 1
+                stats['unique_lines'].add(stripped)
+                stats['word_count'] += len(line.split())
+            else:
+                continue
+
+            first = line[:1]
+            if first == '#':
+                if self._HEADER_LINE_RE.match(line):
+                    stats['header_lines'] += 1
+                    if not consumed:
+                        rest = line.lstrip('#')
+                        if rest.strip():
+                            stats['titled_headers'] += 1
+                        else:
+                            pending_header = True
+                            pending_blank = bool(rest[1:].strip('\n'))
+            elif first == '|':
+                stats['table_rows'] += 1
+            if not list_blocked:
+                match = self._LIST_ITEM_RE.match(line)
+                if match:
+                    stats['list_items'] += 1
+                    list_tail = not line[match.end():].strip()
+            if '```' in line:
+                stats['code_fences'] += line.count('```')
+
+        if chunk:
+            self._scan_chunk(''.join(chunk), stats)
+        if pending_header and pending_blank:
+            stats['titled_headers'] += 1
+
+        return stats
+
+    def _scan_chunk(self, text: str, stats: Dict[str, object]):
+        """扫描一块整行文本：累计关键词次数、统计换行、检查异常重复字符"""
+        stats['line_count'] += text.count('\n')
+        self._add_keyword_counts(text, stats['bitcoin_counts'], stats['technical_counts'])
+        if not stats['excessive_repeats'] and self._EXCESSIVE_REPEAT_RE.search(text):
+            stats['excessive_repeats'] = True
+
+    @staticmethod
+    def stats_path_for(file_path: str) -> Path:
+        """文档对应的质量统计文件路径（与.md同目录，后缀.stats.json）"""
+        return Path(file_path).with_suffix('.stats.json')
+
+    def write_stats(self, report: QualityReport, file_path: str):
+        """
+        把质量报告写到文档旁的.stats.json，并记录文档写入后的大小和修改时间
+
+        Args:
+            report: 已生成的质量报告
+            file_path: 对应的Markdown文件（必须已写入磁盘）
+        """
+        stat = os.stat(file_path)
+        data = asdict(report)
+        data['source_size'] = stat.st_size
+        data['source_mtime_ns'] = stat.st_mtime_ns
+        with open(self.stats_path_for(file_path), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def check_from_stats(self, file_path: str) -> Optional[QualityReport]:
+        """
+        从.stats.json读取质量报告，免去重新读取和分析Markdown
+
+        Args:
+            file_path: Markdown文件路径
+
+        Returns:
+            质量报告；统计文件缺失、损坏或与文档不一致（大小/修改时间变化）时返回None
+        """
+        try:
+            with open(self.stats_path_for(file_path), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            stat = os.stat(file_path)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        if data.pop('source_size', None) != stat.st_size or data.pop('source_mtime_ns', None) != stat.st_mtime_ns:
+            return None
+
+        try:
+            data['file_path'] = str(file_path)
+            return QualityReport(**data)
+        except TypeError:
+            return None
 
     def _check_content_length(self, length: int, issues: List[str], strengths: List[str]) -> float:
         """检查内容长度"""
@@ -154,44 +459,42 @@ class QualityChecker:
             strengths.append("Good content length")
             return 85.0
 
-    def _check_structure(self, content: str, issues: List[str], strengths: List[str]) -> float:
+    def _check_structure(self, line_stats: Dict[str, object], issues: List[str], strengths: List[str]) -> float:
         """检查文档结构"""
         score = 100.0
 
         # 检查标题结构
-        headers = re.findall(r'^(#+)\s+(.+)$', content, re.MULTILINE)
+        headers = line_stats['titled_headers']
         if not headers:
             issues.append("No headers found - poor structure")
             score -= 40
-        elif len(headers) < 3:
+        elif headers < 3:
             issues.append("Few headers - limited structure")
             score -= 20
         else:
-            strengths.append(f"Good structure with {len(headers)} headers")
+            strengths.append(f"Good structure with {headers} headers")
 
         # 检查段落分布
-        paragraphs = [p.strip() for p in content.split('\n\n') if p.strip()]
-        if len(paragraphs) < 5:
+        if line_stats['paragraphs'] < 5:
             issues.append("Few paragraphs - content may be poorly organized")
             score -= 15
 
         # 检查列表和表格
-        lists = re.findall(r'^\s*[-*+]\s+', content, re.MULTILINE)
-        tables = re.findall(r'^\|', content, re.MULTILINE)
+        lists = line_stats['list_items']
+        tables = line_stats['table_rows']
 
         if lists:
-            strengths.append(f"Contains {len(lists)} list items")
+            strengths.append(f"Contains {lists} list items")
         if tables:
-            strengths.append(f"Contains {len(tables)} table rows")
+            strengths.append(f"Contains {tables} table rows")
 
         return max(score, 0.0)
 
-    def _check_bitcoin_relevance(self, content: str, issues: List[str], strengths: List[str]) -> float:
+    def _check_bitcoin_relevance(self, keyword_counts: Dict[str, int], issues: List[str], strengths: List[str]) -> float:
         """检查Bitcoin相关性"""
-        content_lower = content.lower()
-        found_keywords = [kw for kw in self.BITCOIN_KEYWORDS if kw in content_lower]
+        found_keywords = self.BITCOIN_KEYWORDS_SET.intersection(keyword_counts)
 
-        relevance_ratio = len(found_keywords) / len(self.BITCOIN_KEYWORDS)
+        relevance_ratio = len(found_keywords) / len(self.BITCOIN_KEYWORDS_SET)
 
         if relevance_ratio < 0.1:
             issues.append("Low Bitcoin relevance - few related keywords found")
@@ -203,10 +506,9 @@ class QualityChecker:
             strengths.append(f"High Bitcoin relevance ({len(found_keywords)} keywords)")
             return 90.0
 
-    def _check_technical_depth(self, content: str, issues: List[str], strengths: List[str]) -> float:
+    def _check_technical_depth(self, term_counts: Dict[str, int], issues: List[str], strengths: List[str]) -> float:
         """检查技术深度"""
-        content_lower = content.lower()
-        found_terms = [term for term in self.TECHNICAL_TERMS if term in content_lower]
+        found_terms = self.TECHNICAL_TERMS_SET.intersection(term_counts)
 
         if not found_terms:
             issues.append("No technical terms found - may lack technical depth")
@@ -218,41 +520,34 @@ class QualityChecker:
             strengths.append(f"Good technical depth ({len(found_terms)} technical terms)")
             return 85.0
 
-    def _check_format_quality(self, content: str, issues: List[str], strengths: List[str]) -> float:
+    def _check_format_quality(self, line_stats: Dict[str, object], issues: List[str], strengths: List[str]) -> float:
         """检查格式质量"""
         score = 100.0
 
         # 检查异常重复字符
-        excessive_repeats = re.findall(r'(.)\1{10,}', content)
-        if excessive_repeats:
+        if line_stats['excessive_repeats']:
             issues.append("Excessive character repetition detected")
             score -= 30
 
         # 检查异常的章节编号
-        weird_numbering = re.findall(r'#+\s*\d+(\.\d+){5,}', content)
-        if weird_numbering:
+        if line_stats['weird_numbering']:
             issues.append("Abnormal section numbering detected")
             score -= 25
 
         # 检查格式标记
-        if '```' in content:
+        if line_stats['code_fences']:
             strengths.append("Contains code blocks")
-        if re.search(r'\*\*[^*]+\*\*', content):
+        if line_stats['bold']:
             strengths.append("Contains bold formatting")
-        if re.search(r'^\|', content, re.MULTILINE):
+        if line_stats['table_rows']:
             strengths.append("Contains tables")
 
         return max(score, 0.0)
 
-    def _check_duplication(self, content: str, issues: List[str], strengths: List[str]) -> float:
+    def _check_duplication(self, line_stats: Dict[str, object], issues: List[str], strengths: List[str]) -> float:
         """检查重复内容"""
-        lines = content.split('\n')
-        unique_lines = set(line.strip() for line in lines if line.strip())
-
-        if len(lines) == 0:
-            return 0.0
-
-        uniqueness_ratio = len(unique_lines) / len([line for line in lines if line.strip()])
+        # 非空行为0时与原实现一样抛出ZeroDivisionError，由调用方记为处理失败
+        uniqueness_ratio = len(line_stats['unique_lines']) / line_stats['nonblank_lines']
 
         if uniqueness_ratio < 0.7:
             issues.append("High content duplication detected")
@@ -264,10 +559,39 @@ class QualityChecker:
             strengths.append("Good content uniqueness")
             return 95.0
 
-    def _count_keywords(self, content: str, keywords: List[str]) -> int:
-        """统计关键词出现次数"""
-        content_lower = content.lower()
-        return sum(content_lower.count(keyword) for keyword in keywords)
+    def _add_keyword_counts(self, text: str, bitcoin_counts: Dict[str, int], technical_counts: Dict[str, int]):
+        """
+        把text中Bitcoin关键词和技术术语的出现次数累加到两个计数字典
+
+        装有pyahocorasick时用自动机一次扫描两个词表，否则每个词表一次正则扫描
+        """
+        if self._KEYWORD_AUTOMATON is None:
+            self._count_keywords(text, self._BITCOIN_RE, self._BITCOIN_CREDITS, bitcoin_counts)
+            self._count_keywords(text, self._TECHNICAL_RE, self._TECHNICAL_CREDITS, technical_counts)
+            return
+
+        buckets = {'bitcoin': bitcoin_counts, 'technical': technical_counts}
+        last_end = {}
+        for end, kinds in self._KEYWORD_AUTOMATON.iter(text.lower()):
+            for kind, keyword in kinds:
+                # 自动机报告全部重叠命中，与str.count一致只计不重叠的
+                start = end + 1 - len(keyword)
+                if start < last_end.get(keyword, 0):
+                    continue
+                last_end[keyword] = end + 1
+                bucket = buckets[kind]
+                bucket[keyword] = bucket.get(keyword, 0) + 1
+
+    def _count_keywords(self, text: str, pattern: re.Pattern, credits: Dict[str, List[str]], counts: Dict[str, int]):
+        """把各关键词出现次数（不区分大小写，与str.count一样不计重叠出现）累加到counts"""
+        last_end = {}
+        for match in pattern.finditer(text):
+            start = match.start()
+            for keyword in credits[match.group(1).lower()]:
+                if start < last_end.get(keyword, 0):
+                    continue
+                last_end[keyword] = start + len(keyword)
+                counts[keyword] = counts.get(keyword, 0) + 1
 
     def generate_report_summary(self, report: QualityReport) -> str:
         """生成报告摘要"""
@@ -2,6 +2,7 @@
 # Test script for Milo Bitcoin data collection
 
 import asyncio
+import logging
 import sys
 import os
 
@@ -17,10 +18,21 @@ async def test_individual_apis():
     collector = BitcoinDataCollector()
     
     try:
+        # The four APIs are independent, so probe them concurrently;
+        # return_exceptions keeps one failing API from cancelling the others
+        price_data, onchain_data, sentiment_data, news_data = await asyncio.gather(
+            collector.get_bitcoin_price_data(),
+            collector.get_on_chain_metrics(),
+            collector.get_fear_greed_index(),
+            collector.get_bitcoin_news(limit=3),
+            return_exceptions=True,
+        )
+
         # Test 1: CoinGecko (Price data)
         print("1️⃣ Testing CoinGecko API (Price data)...")
-        price_data = await collector.get_bitcoin_price_data()
-        if price_data and 'bitcoin' in price_data:
+        if isinstance(price_data, Exception):
+            print(f"   ❌ Failed to get price data: {price_data}")
+        elif price_data and 'bitcoin' in price_data:
             btc = price_data['bitcoin']
             print(f"   ✅ Success! Price: ${btc.get('usd', 'N/A'):,}")
             print(f"   📊 Market Cap: ${btc.get('usd_market_cap', 'N/A'):,}")
@@ -31,8 +43,9 @@ async def test_individual_apis():
         
         # Test 2: Blockchain.info (On-chain data)
         print("2️⃣ Testing Blockchain.info API (On-chain data)...")
-        onchain_data = await collector.get_on_chain_metrics()
-        if onchain_data:
+        if isinstance(onchain_data, Exception):
+            print(f"   ❌ Failed to get on-chain data: {onchain_data}")
+        elif onchain_data:
             print(f"   ✅ Success! Transactions: {onchain_data.get('n_tx', 'N/A'):,}")
             print(f"   ⛓️ Hash Rate: {onchain_data.get('hash_rate', 'N/A')}")
         else:
@@ -42,8 +55,9 @@ async def test_individual_apis():
         
         # Test 3: Alternative.me (Fear & Greed)
         print("3️⃣ Testing Alternative.me API (Fear & Greed Index)...")
-        sentiment_data = await collector.get_fear_greed_index()
-        if sentiment_data and sentiment_data.get('data'):
+        if isinstance(sentiment_data, Exception):
+            print(f"   ❌ Failed to get sentiment data: {sentiment_data}")
+        elif sentiment_data and sentiment_data.get('data'):
             fg = sentiment_data['data'][0]
             print(f"   ✅ Success! Sentiment: {fg.get('value_classification', 'N/A')} ({fg.get('value', 'N/A')}/100)")
         else:
@@ -53,8 +67,9 @@ async def test_individual_apis():
         
         # Test 4: News API (optional)
         print("4️⃣ Testing NewsAPI (Bitcoin news - optional)...")
-        news_data = await collector.get_bitcoin_news(limit=3)
-        if news_data:
+        if isinstance(news_data, Exception):
+            print(f"   ⚠️ News request failed: {news_data}")
+        elif news_data:
             print(f"   ✅ Success! Found {len(news_data)} articles")
             for i, article in enumerate(news_data[:2], 1):
                 print(f"   📰 {i}. {article.get('title', 'No title')[:60]}...")
@@ -62,7 +77,7 @@ async def test_individual_apis():
             print("   ⚠️ No news data (likely missing NEWS_API_KEY)")
         
     finally:
-        collector.close()
+        await collector.aclose()
 
 async def test_comprehensive_collection():
     """Test comprehensive data collection"""
@@ -103,10 +118,11 @@ async def test_comprehensive_collection():
     except Exception as e:
         print(f"❌ Comprehensive test failed: {e}")
     finally:
-        collector.close()
+        await collector.aclose()
 
 async def main():
     """Main test function"""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("🐱₿ Milo Bitcoin Data Collection Test")
     print("=" * 50)
     print("Testing APIs without requiring API keys...")